@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.utils.timezone import now
 from .models import *
 
 
@@ -16,7 +17,8 @@ admin.site.register(OpenSpace, OpenSpaceAdmin)
 
 
 class ReportAdmin(admin.ModelAdmin):
-    list_display = ('id','report_id','description', 'space_name', 'district', 'street', 'email', 'file', 'created_at', 'latitude', 'longitude','user')
+    list_display = ('id','report_id','description', 'space_name', 'district', 'street', 'email', 'file', 'created_at', 'latitude', 'longitude','user', 'moderation_status')
+    list_filter = ('moderation_status',)
 admin.site.register(Report, ReportAdmin)
 
 class ReportHistoryAdmin(admin.ModelAdmin):
@@ -79,4 +81,26 @@ class ReportReplyAdmin(admin.ModelAdmin):
     list_display = ('report', 'replied_by', 'message')
     list_per_page = 10
     list_max_show_all = 10
-admin.site.register(ReportReply, ReportReplyAdmin)
\ No newline at end of file
+admin.site.register(ReportReply, ReportReplyAdmin)
+
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'checked', 'created_at')
+    readonly_fields = ('name', 'size', 'refcount', 'checked', 'created_at')
+admin.site.register(StoredBlob, StoredBlobAdmin)
+
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    search_fields = ('recipient',)
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry_messages']
+
+    @admin.action(description='Retry selected messages')
+    def retry_messages(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=now())
+        self.message_user(request, f'{updated} message(s) queued again.')
+admin.site.register(OutboundMessage, OutboundMessageAdmin)
+
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'created_by', 'created_at')
+admin.site.register(Broadcast, BroadcastAdmin)
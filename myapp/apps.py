@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.ENVIRONMENT == 'production':
+            # Build the SMS gateway now, so a bad configuration (e.g. the
+            # placeholder BEEM_SENDER_ID) stops the process instead of the first text
+            from .sms_gateway import get_gateway
+            get_gateway()
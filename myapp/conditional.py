@@ -0,0 +1,100 @@
+"""
+HTTP conditional requests (If-None-Match / ETag) for the JSON APIs.
+
+Views work out a cheap version token first, answer 304 if the client
+already has that version, and only then build the payload.
+
+For list endpoints, @etag_from(...) derives the token from each queryset's
+row count and newest updated_at/created_at: one aggregate query per
+queryset instead of loading and serializing the rows. The newest time is
+also sent as Last-Modified, but only If-None-Match is honoured, because a
+deleted row lowers the count without moving the newest timestamp.
+
+Every ETag also carries SCHEMA_VERSION, so a deploy that changes what a
+response looks like (new serializer fields, signed URLs, pagination) is not
+answered with 304 against a body cached before it. The cursor/page query
+parameters are part of list ETags, since each page is a different body.
+"""
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+# Bump whenever a response body changes shape without any row changing
+SCHEMA_VERSION = 2
+# Query parameters that pick which page of a list is returned
+PAGE_PARAMS = ('cursor', 'page', 'page_size')
+
+
+def make_etag(*parts):
+    return quote_etag('-'.join(str(part) for part in (f'v{SCHEMA_VERSION}', *parts)))
+
+
+def not_modified(request, etag):
+    """True if the client's If-None-Match already covers `etag`."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    # Weak comparison: a W/ prefix on either side still matches
+    return '*' in etags or etag.removeprefix('W/') in [e.removeprefix('W/') for e in etags]
+
+
+def not_modified_response(etag):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+
+def with_etag(response, etag):
+    response['ETag'] = etag
+    # Clients may keep the body but must check back before reusing it
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def queryset_version(querysets, *extra):
+    """
+    (etag, last_modified) for a list of (queryset, timestamp field) pairs;
+    last_modified is a Unix time or None for empty lists. `extra` parts are
+    added to the ETag as they are.
+    """
+    parts = []
+    newest = None
+    for queryset, field in querysets:
+        summary = queryset.order_by().aggregate(rows=Count('pk'), newest=Max(field))
+        stamp = summary['newest'].timestamp() if summary['newest'] else 0
+        parts += [summary['rows'], f'{stamp:.6f}']
+        newest = max(newest or 0, stamp) or None
+    return make_etag('q', *parts, *extra), newest
+
+
+def etag_from(get_querysets, vary=None):
+    """
+    Decorate a GET handler (function view or view method). get_querysets(request)
+    returns the (queryset, timestamp field) pairs the response is built from;
+    it should apply the same filters as the view, and may return None to skip.
+    The pagination parameters (PAGE_PARAMS) are always part of the ETag;
+    vary() adds anything else the body depends on, e.g. the expiry of signed
+    media URLs (media_access.current_expiry).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            request = args[0] if hasattr(args[0], 'method') else args[1]
+            querysets = get_querysets(request)
+            if querysets is None:
+                return view(*args, **kwargs)
+            page = [request.GET.get(param, '') for param in PAGE_PARAMS]
+            extra = [vary()] if vary is not None else []
+            etag, last_modified = queryset_version(querysets, *page, *extra)
+            if not_modified(request, etag):
+                return not_modified_response(etag)
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                with_etag(response, etag)
+                if last_modified:
+                    response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,78 @@
+"""
+Counts for the ward executive dashboard.
+
+Each table is read once: every status is counted in the same pass with
+Count(filter=Q(...)) instead of one COUNT query per number. Dashboards are
+polled every few seconds by every logged-in executive, so the results are
+also cached for DASHBOARD_CACHE_TTL seconds; ward-wide counts are shared by
+all executives of the ward, report counts are per executive. If the cache
+is down the counts are read straight from the database.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+
+from .models import OpenSpace, OpenSpaceBooking, ReportForward, ReportForwardToadmin
+
+logger = logging.getLogger(__name__)
+
+
+def _counts_by(queryset, field, values):
+    """{'total': n, value: n, ...} for `field` in one aggregate query."""
+    counts = {'total': Count('pk')}
+    counts.update({value: Count('pk', filter=Q(**{field: value})) for value in values})
+    return queryset.order_by().aggregate(**counts)
+
+
+def openspace_counts(ward):
+    return _counts_by(
+        OpenSpace.objects.filter(district=ward), 'status',
+        [value for value, _ in OpenSpace.STATUS_CHOICES],
+    )
+
+
+def booking_counts(bookings):
+    return _counts_by(bookings, 'status', [value for value, _ in OpenSpaceBooking.STATUS_CHOICES])
+
+
+def report_counts(user):
+    """Reports forwarded to `user`, split by whether they escalated them to an admin."""
+    escalated = ReportForwardToadmin.objects.filter(report=OuterRef('report'), from_user=user)
+    counts = ReportForward.objects.filter(to_user=user).order_by().aggregate(
+        total=Count('pk'),
+        forwarded_to_admin=Count('pk', filter=Q(Exists(escalated))),
+    )
+    counts['pending'] = counts['total'] - counts['forwarded_to_admin']
+    return counts
+
+
+def _cached(key, build):
+    try:
+        data = cache.get(key)
+    except Exception:
+        logger.warning('Dashboard cache unavailable; reading from the database', exc_info=True)
+        return build()
+    if data is None:
+        data = build()
+        try:
+            cache.set(key, data, settings.DASHBOARD_CACHE_TTL)
+        except Exception:
+            logger.warning('Could not cache dashboard counts', exc_info=True)
+    return data
+
+
+def ward_dashboard(user):
+    ward = user.ward
+
+    def ward_counts():
+        return {
+            'openspaces': openspace_counts(ward),
+            'bookings': booking_counts(OpenSpaceBooking.objects.filter(district=ward.name)),
+        }
+
+    data = {'ward': ward.name}
+    data.update(_cached(f'dashboard:ward:{ward.pk}', ward_counts))
+    data['reports'] = _cached(f'dashboard:reports:{user.pk}', lambda: report_counts(user))
+    return data
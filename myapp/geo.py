@@ -0,0 +1,102 @@
+"""
+Nearby open spaces and reports on the map.
+
+OpenSpace and Report store plain latitude/longitude floats. Each row also
+stores grid_cell, the number of the CELL_DEGREES x CELL_DEGREES cell it falls
+in (row-major: row * COLUMNS + column), under an ordinary B-tree index. A
+bounding box then becomes one grid_cell range per grid row it spans, i.e. a
+handful of index range scans instead of a scan of every row; exact
+coordinates refine the candidates (a lat/lon check for boxes, haversine
+distance for radius searches).
+
+grid_cell is set in save(). Changing CELL_DEGREES means recomputing every
+row's grid_cell.
+"""
+import math
+
+from django.db.models import Avg, Count, F, Q
+
+EARTH_RADIUS_M = 6_371_000
+CELL_DEGREES = 0.01  # about 1.1 km north-south
+COLUMNS = round(360 / CELL_DEGREES)
+
+
+def _row(lat):
+    return math.floor((lat + 90) / CELL_DEGREES)
+
+
+def _column(lon):
+    return math.floor((lon + 180) / CELL_DEGREES) % COLUMNS
+
+
+def grid_cell(lat, lon):
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * COLUMNS + _column(lon)
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def box_around(lat, lon, radius_m):
+    """(south, west, north, east) of a box containing the circle."""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+    return max(lat - dlat, -90), max(lon - dlon, -180), min(lat + dlat, 90), min(lon + dlon, 180)
+
+
+def in_box(south, west, north, east):
+    """Q for rows inside the box: grid_cell ranges (indexed), then exact coordinates."""
+    first, last = _column(west), _column(east)
+    cells = Q()
+    for row in range(_row(south), _row(north) + 1):
+        cells |= Q(grid_cell__range=(row * COLUMNS + first, row * COLUMNS + last))
+    return cells & Q(latitude__range=(south, north), longitude__range=(west, east))
+
+
+def nearest(queryset, lat, lon, radius_m, limit):
+    """Up to `limit` rows within radius_m of (lat, lon), closest first, each with `.distance_m`."""
+    found = []
+    for row in queryset.filter(in_box(*box_around(lat, lon, radius_m))):
+        row.distance_m = haversine_m(lat, lon, row.latitude, row.longitude)
+        if row.distance_m <= radius_m:
+            found.append(row)
+    found.sort(key=lambda row: row.distance_m)
+    return found[:limit]
+
+
+def clusters(queryset, south, west, north, east, max_per_side=32, min_exact=1):
+    """
+    Rows in the box grouped into at most max_per_side x max_per_side blocks of
+    grid cells: [{'count', 'latitude', 'longitude'}] with the mean position.
+    Groups of fewer than min_exact rows get their block's centre instead, so
+    a lone row's coordinates are not given away.
+    """
+    span = max(north - south, east - west)
+    block = max(1, math.ceil(span / CELL_DEGREES / max_per_side))
+    groups = (
+        queryset.filter(in_box(south, west, north, east))
+        # Integer arithmetic throughout, so the blocks are whole cells
+        .annotate(
+            block_row=F('grid_cell') / COLUMNS / block,
+            block_column=(F('grid_cell') - F('grid_cell') / COLUMNS * COLUMNS) / block,
+        )
+        .values('block_row', 'block_column')
+        .annotate(n=Count('pk'), mean_latitude=Avg('latitude'), mean_longitude=Avg('longitude'))
+        .order_by()
+    )
+    found = []
+    for group in groups:
+        if group['n'] >= min_exact:
+            latitude, longitude = group['mean_latitude'], group['mean_longitude']
+        else:
+            latitude = min((group['block_row'] + 0.5) * block * CELL_DEGREES - 90, 90)
+            longitude = min((group['block_column'] + 0.5) * block * CELL_DEGREES - 180, 180)
+        found.append({'count': group['n'], 'latitude': latitude, 'longitude': longitude})
+    return found
@@ -0,0 +1,81 @@
+"""
+Thumbnail and display-size renditions for uploaded images.
+
+tasks.generate_image_renditions_task writes a WebP and a JPEG copy of each
+rendition, named after the original (reports/photo.png ->
+reports/photo__thumb.webp; the content-addressed storage then files them
+under blobs/ like any other upload), and records the stored names on the
+model, so serializers can hand out URLs without touching storage.
+"""
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# name -> bounding box; images are only ever scaled down
+RENDITIONS = {
+    'thumb': (320, 320),
+    'display': (1280, 1280),
+}
+
+# format key -> (Pillow format, extension, save options)
+RENDITION_FORMATS = {
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# model label -> (image field, renditions JSON field)
+IMAGE_FIELDS = {
+    'myapp.Report': ('file', 'file_renditions'),
+    'myapp.CustomUser': ('profile_image', 'profile_image_renditions'),
+}
+
+
+def rendition_name(original_name, rendition, extension):
+    stem, _ = os.path.splitext(original_name)
+    return f'{stem}__{rendition}{extension}'
+
+
+def render(original_name):
+    """
+    Build every rendition of a stored image and save it next to the original.
+    Returns {rendition: {format: stored name}}, or {} if the file is not an
+    image. A missing file raises FileNotFoundError, so the task retries.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with default_storage.open(original_name, 'rb') as fh:
+            with Image.open(fh) as source:
+                source = ImageOps.exif_transpose(source)
+                if source.mode not in ('RGB', 'RGBA'):
+                    source = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+                source.load()
+    except UnidentifiedImageError:
+        return {}
+
+    renditions = {}
+    for rendition, box in RENDITIONS.items():
+        image = source.copy()
+        image.thumbnail(box, Image.LANCZOS)
+        renditions[rendition] = {}
+        for key, (pil_format, extension, options) in RENDITION_FORMATS.items():
+            out = image.convert('RGB') if pil_format == 'JPEG' else image
+            buffer = io.BytesIO()
+            out.save(buffer, format=pil_format, **options)
+
+            name = rendition_name(original_name, rendition, extension)
+            renditions[rendition][key] = default_storage.save(name, ContentFile(buffer.getvalue()))
+    return renditions
+
+
+def rendition_urls(renditions, request=None):
+    """Turn a stored renditions dict into {rendition: {format: url}}."""
+    urls = {}
+    for rendition, formats in (renditions or {}).items():
+        urls[rendition] = {}
+        for key, name in formats.items():
+            url = default_storage.url(name)
+            urls[rendition][key] = request.build_absolute_uri(url) if request else url
+    return urls
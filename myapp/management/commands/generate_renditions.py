@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from myapp.images import IMAGE_FIELDS
+from myapp.models import CustomUser, Report
+from myapp.tasks import generate_image_renditions_task
+
+
+class Command(BaseCommand):
+    help = "Queue thumbnail/display renditions for report photos and profile images that have none yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true', help="Render in this process instead of queueing")
+
+    def handle(self, *args, **options):
+        for model in (Report, CustomUser):
+            label = model._meta.label
+            image_field, renditions_field = IMAGE_FIELDS[label]
+            pks = (
+                model.objects
+                .exclude(**{f'{image_field}__isnull': True})
+                .exclude(**{image_field: ''})
+                .filter(**{renditions_field: {}})
+                .values_list('pk', flat=True)
+            )
+            count = 0
+            for pk in pks.iterator():
+                if options['sync']:
+                    generate_image_renditions_task.run(label, pk)
+                else:
+                    generate_image_renditions_task.delay(label, pk)
+                count += 1
+            self.stdout.write(f"{label}: {count} image(s) {'rendered' if options['sync'] else 'queued'}")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from myapp.models import Report
+from myapp.streets import resolve_report_street, street_index
+
+
+class Command(BaseCommand):
+    help = "Resolve the free-text street of existing reports to Street rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-resolve reports that already have a street")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        index = street_index()
+        reports = Report.objects.exclude(street__isnull=True, street_name_backup__isnull=True)
+        if not options['all']:
+            reports = reports.filter(resolved_street__isnull=True)
+
+        changed, seen = [], 0
+        fields = ('pk', 'street', 'street_name_backup', 'district', 'resolved_street_id', 'updated_at')
+        for report in reports.only(*fields).iterator(chunk_size=options['batch_size']):
+            seen += 1
+            street_id = resolve_report_street(report, index)
+            if street_id != report.resolved_street_id:
+                report.resolved_street_id = street_id
+                # Moves the inbox ETags (see conditional.py)
+                report.updated_at = now()
+                changed.append(report)
+            if len(changed) >= options['batch_size']:
+                Report.objects.bulk_update(changed, ['resolved_street', 'updated_at'])
+                changed = []
+        Report.objects.bulk_update(changed, ['resolved_street', 'updated_at'])
+        self.stdout.write(f"{seen} report(s) checked")
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate
+
+from myapp import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-day statistics counters (e.g. to backfill history)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First day to rebuild, YYYY-MM-DD (default: 30 days ago)")
+        parser.add_argument('--until', help="Last day to rebuild, YYYY-MM-DD (default: today)")
+        parser.add_argument('--metric', action='append', choices=list(rollups.SOURCES), help="Only this metric (repeatable)")
+
+    def handle(self, *args, **options):
+        try:
+            until = parse_date(options['until']) if options['until'] else localdate()
+            since = parse_date(options['since']) if options['since'] else until - timedelta(days=30)
+        except ValueError as e:
+            raise CommandError(e)
+        if not since or not until or until < since:
+            raise CommandError("Give --since/--until as YYYY-MM-DD, with --since first")
+        written = rollups.rollup(since, until, options['metric'])
+        self.stdout.write(f"{since}..{until}: {written} counter(s) written")
@@ -0,0 +1,103 @@
+"""
+Who may see which media file.
+
+Media is served by views.serve_media, which authorizes the request and then
+hands the transfer to nginx with X-Accel-Redirect. URLs produced by the
+storage carry a signature (`?e=<expiry>&s=<signature>`): the API endpoint
+that returned the URL already did the permission check, so a valid signature
+is enough. Unsigned requests are authorized per file against the rows that
+reference it.
+"""
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+
+from .models import (
+    CustomUser,
+    OpenSpaceBooking,
+    Report,
+    ReportForward,
+    ReportForwardToadmin,
+    ReportHistory,
+)
+
+_signer = signing.Signer(salt='myapp.media')
+
+
+def current_expiry():
+    """Expiry stamped on URLs signed now; API ETags that embed media URLs include it."""
+    # Round up to the hour so the same file keeps the same URL (and stays in
+    # browser caches) for a while
+    ttl = settings.MEDIA_URL_TTL
+    return (int(time.time()) // 3600 + 1) * 3600 + ttl
+
+
+def sign_url(url, name):
+    expires = current_expiry()
+    signature = _signer.signature(f'{name}:{expires}')
+    return f'{url}?e={expires}&s={signature}'
+
+
+def has_valid_signature(name, params):
+    try:
+        expires = int(params.get('e', ''))
+    except ValueError:
+        return False
+    if expires < time.time():
+        return False
+    return signing.constant_time_compare(
+        params.get('s', ''), _signer.signature(f'{name}:{expires}')
+    )
+
+
+def _is_staff(user):
+    return user.is_staff or getattr(user, 'role', None) == 'staff'
+
+
+def _can_view_report(user, report):
+    if report.user_id == user.id:
+        return True
+    forward_chain = Q(from_user=user) | Q(to_user=user)
+    if ReportForward.objects.filter(forward_chain, report=report).exists():
+        return True
+    if ReportForwardToadmin.objects.filter(forward_chain, report=report).exists():
+        return True
+    # Village chairmen see the reports for their street before forwarding them
+    # (the same street link their inbox uses, see streets.py)
+    if user.role == 'village_chairman':
+        return user.street_id is not None and report.resolved_street_id == user.street_id
+    return False
+
+
+def can_view_report_files(user, report):
+    """Whether `user` may be handed signed URLs for this report's attachment and renditions."""
+    if not user or not user.is_authenticated:
+        return False
+    return _is_staff(user) or _can_view_report(user, report)
+
+
+def can_view_media(user, name):
+    if not user or not user.is_authenticated:
+        return False
+    if _is_staff(user):
+        return True
+
+    reports = Report.objects.filter(Q(file=name) | Q(file_renditions__icontains=name))
+    if any(_can_view_report(user, report) for report in reports):
+        return True
+
+    if ReportHistory.objects.filter(file=name, user=user).exists():
+        return True
+
+    booking_access = Q(user=user)
+    if user.role == 'ward_executive' and user.ward_id:
+        booking_access |= Q(district=user.ward.name)
+    if OpenSpaceBooking.objects.filter(booking_access, file=name).exists():
+        return True
+
+    # Profile pictures are visible to any signed-in user
+    return CustomUser.objects.filter(
+        Q(profile_image=name) | Q(profile_image_renditions__icontains=name)
+    ).exists()
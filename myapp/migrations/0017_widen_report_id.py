@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0016_remove_reportforward_message_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='report_id',
+            field=models.CharField(editable=False, max_length=12, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='reporthistory',
+            name='report_id',
+            field=models.CharField(editable=False, max_length=12),
+        ),
+    ]
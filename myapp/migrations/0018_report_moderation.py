@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0017_widen_report_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='moderation_reason',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        # Reports that already exist passed the old inline checks
+        migrations.AddField(
+            model_name='report',
+            name='moderation_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='approved', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='moderation_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', max_length=10),
+        ),
+    ]
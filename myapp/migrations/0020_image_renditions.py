@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0019_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='file_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0021_storedblob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='openspacebooking',
+            index=models.Index(fields=['space', 'startdate', 'enddate'], name='booking_space_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+
+
+def backfill_occupancy(apps, schema_editor):
+    # Bookings made before the occupancy table existed may overlap; the first
+    # one to claim a day keeps it.
+    OpenSpaceBooking = apps.get_model('myapp', 'OpenSpaceBooking')
+    SpaceOccupancy = apps.get_model('myapp', 'SpaceOccupancy')
+    rows = []
+    holding = OpenSpaceBooking.objects.filter(status__in=('pending', 'accepted')).order_by('created_at', 'id')
+    for booking in holding.iterator():
+        last_day = booking.enddate or booking.startdate
+        for n in range((last_day - booking.startdate).days + 1):
+            rows.append(SpaceOccupancy(
+                space_id=booking.space_id, day=booking.startdate + timedelta(days=n), booking_id=booking.id,
+            ))
+    SpaceOccupancy.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0022_booking_space_dates_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpaceOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+            ],
+        ),
+        # 0022's (space, startdate, enddate) index served the overlap checks,
+        # which now read SpaceOccupancy (unique (space, day) plus the
+        # (day, space) index below). Nothing else filters bookings by space
+        # and dates, so keeping it would only slow down booking writes.
+        migrations.RemoveIndex(
+            model_name='openspacebooking',
+            name='booking_space_dates_idx',
+        ),
+        migrations.AddField(
+            model_name='spaceoccupancy',
+            name='booking',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupied_days', to='myapp.openspacebooking'),
+        ),
+        migrations.AddField(
+            model_name='spaceoccupancy',
+            name='space',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='myapp.openspace'),
+        ),
+        migrations.AddIndex(
+            model_name='spaceoccupancy',
+            index=models.Index(fields=['day', 'space'], name='occupancy_day_space_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='spaceoccupancy',
+            constraint=models.UniqueConstraint(fields=('space', 'day'), name='unique_space_day'),
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0023_spaceoccupancy'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='openspacebooking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected'), ('completed', 'Completed')], default='pending', max_length=10),
+        ),
+    ]
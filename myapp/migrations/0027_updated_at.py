@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0026_broadcast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openspacebooking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0027_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('reports', 'Reports'), ('bookings', 'Bookings'), ('forwards', 'Reports forwarded to ward executives'), ('escalations', 'Reports forwarded to admin'), ('ussd_reports', 'USSD reports')], max_length=20)),
+                ('day', models.DateField()),
+                ('ward', models.CharField(blank=True, max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ussdreport',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='dailystat',
+            constraint=models.UniqueConstraint(fields=('metric', 'day', 'ward'), name='dailystat_metric_day_ward'),
+        ),
+    ]
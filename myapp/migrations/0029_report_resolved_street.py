@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0028_dailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='resolved_street',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to='myapp.street'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['resolved_street', '-created_at'], name='report_street_created_idx'),
+        ),
+    ]
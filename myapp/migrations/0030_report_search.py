@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# PostgreSQL only; SQLite gets an FTS5 table instead (see myapp/search.py)
+
+
+def search_indexes():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return [
+        GinIndex(
+            SearchVector('description', 'space_name', 'street', 'district', config='simple'),
+            name='report_search_vector_idx',
+        ),
+        GinIndex(fields=['space_name'], opclasses=['gin_trgm_ops'], name='report_space_name_trgm_idx'),
+        GinIndex(fields=['street'], opclasses=['gin_trgm_ops'], name='report_street_trgm_idx'),
+        GinIndex(fields=['district'], opclasses=['gin_trgm_ops'], name='report_district_trgm_idx'),
+    ]
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    Report = apps.get_model('myapp', 'Report')
+    for index in search_indexes():
+        schema_editor.add_index(Report, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Report = apps.get_model('myapp', 'Report')
+    for index in search_indexes():
+        schema_editor.remove_index(Report, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0029_report_resolved_street'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
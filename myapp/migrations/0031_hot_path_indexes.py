@@ -0,0 +1,70 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0030_report_search'),
+    ]
+
+    # Build the composite indexes before dropping the single-column FK
+    # indexes they replace, so the lookups are never left unindexed
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='openspace',
+            index=models.Index(fields=['district', 'status'], name='openspace_district_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='openspacebooking',
+            index=models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='openspacebooking',
+            index=models.Index(fields=['district', 'status'], name='booking_district_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportforward',
+            index=models.Index(fields=['to_user', '-forwarded_at'], name='forward_to_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportforwardtoadmin',
+            index=models.Index(fields=['report', 'from_user'], name='forward_admin_report_from_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportforwardtoadmin',
+            index=models.Index(fields=['to_user', '-forwarded_at'], name='forward_admin_to_user_idx'),
+        ),
+        migrations.AlterField(
+            model_name='openspace',
+            name='district',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='openspaces', to='myapp.ward'),
+        ),
+        migrations.AlterField(
+            model_name='openspacebooking',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='reportforward',
+            name='to_user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports_received', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='reportforwardtoadmin',
+            name='report',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='forwards_to_admin', to='myapp.report'),
+        ),
+        migrations.AlterField(
+            model_name='reportforwardtoadmin',
+            name='to_user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports_received_by_admin', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
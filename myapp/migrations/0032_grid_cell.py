@@ -0,0 +1,47 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:29
+
+import math
+
+from django.db import migrations, models
+
+# Same numbering as myapp/geo.py at the time of this migration
+CELL_DEGREES = 0.01
+COLUMNS = 36000
+
+
+def fill_grid_cells(apps, schema_editor):
+    for model_name in ('OpenSpace', 'Report'):
+        model = apps.get_model('myapp', model_name)
+        rows = model.objects.filter(latitude__isnull=False, longitude__isnull=False).only('latitude', 'longitude')
+        batch = []
+        for row in rows.iterator(chunk_size=1000):
+            row.grid_cell = (
+                math.floor((row.latitude + 90) / CELL_DEGREES) * COLUMNS
+                + math.floor((row.longitude + 180) / CELL_DEGREES) % COLUMNS
+            )
+            batch.append(row)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['grid_cell'])
+                batch = []
+        model.objects.bulk_update(batch, ['grid_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0031_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openspace',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0032_grid_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='chunk_lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
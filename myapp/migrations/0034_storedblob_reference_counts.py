@@ -0,0 +1,47 @@
+from collections import Counter
+
+from django.db import migrations
+
+# Same fields as myapp/storage.py MEDIA_FIELDS at the time of this migration
+MEDIA_FIELDS = {
+    'Report': ('file', 'file_renditions'),
+    'ReportHistory': ('file',),
+    'OpenSpaceBooking': ('file',),
+    'CustomUser': ('profile_image', 'profile_image_renditions'),
+}
+
+
+def count_references(apps, schema_editor):
+    """StoredBlob.refcount used to count saves; make it count referencing fields."""
+    references = Counter()
+    for model_name, fields in MEDIA_FIELDS.items():
+        model = apps.get_model('myapp', model_name)
+        for values in model.objects.values_list(*fields).iterator(chunk_size=1000):
+            for value in values:
+                if isinstance(value, dict):
+                    references.update(name for formats in value.values() for name in formats.values() if name)
+                elif value:
+                    references[str(value)] += 1
+
+    StoredBlob = apps.get_model('myapp', 'StoredBlob')
+    batch = []
+    for blob in StoredBlob.objects.only('name', 'refcount', 'checked').iterator(chunk_size=1000):
+        blob.refcount = references[blob.name]
+        # Unreferenced blobs go back to the orphan sweep
+        blob.checked = blob.checked and blob.refcount > 0
+        batch.append(blob)
+        if len(batch) == 1000:
+            StoredBlob.objects.bulk_update(batch, ['refcount', 'checked'])
+            batch = []
+    StoredBlob.objects.bulk_update(batch, ['refcount', 'checked'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0033_uploadsession_chunk_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,17 @@
 import random
 import string
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
 from django.core.mail import send_mail
 import uuid
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
+from .geo import grid_cell
+from .report_ids import REPORT_ID_LENGTH, generate_report_id
+from django.utils.timezone import now
+
+REPORT_ID_MAX_ATTEMPTS = 3
 
 
 class UssdReport(models.Model):
@@ -15,6 +20,7 @@ class UssdReport(models.Model):
     open_space = models.CharField(max_length=255, default='Unknown')  # Add default value here
     description = models.TextField()
     status = models.CharField(max_length=50, default='Pending')
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
 
     def __str__(self):
         return self.reference_number
@@ -32,7 +38,7 @@ class UserProfile(models.Model):
     
 class ReportHistory(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
-    report_id = models.CharField(max_length=8, editable=False)
+    report_id = models.CharField(max_length=REPORT_ID_LENGTH, editable=False)
     description = models.TextField()
     email = models.EmailField(blank=True, null=True)
     file = models.CharField(max_length=500, blank=True, null=True)
@@ -58,41 +64,113 @@ class Street(models.Model):
         return f"{self.name} ({self.ward.name})"
 
 
+def _is_report_id_clash(error):
+    """Whether an IntegrityError came from the unique index on Report.report_id."""
+    # psycopg names the constraint; other backends only say it in the message
+    diag = getattr(error.__cause__, 'diag', None)
+    return 'report_id' in (getattr(diag, 'constraint_name', None) or str(error))
+
+
+class ReportQuerySet(models.QuerySet):
+    def visible(self):
+        """Reports that lists and counts may show: everything moderation has not rejected."""
+        return self.exclude(moderation_status='rejected')
+
+
 class Report(models.Model):
-    report_id = models.CharField(max_length=8, unique=True, editable=False)
+    MODERATION_CHOICES = [
+        ('pending', 'Pending'),
+        ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
+    ]
+
+    report_id = models.CharField(max_length=REPORT_ID_LENGTH, unique=True, editable=False)
     description = models.TextField()
     email = models.EmailField(blank=True, null=True)
     file = models.FileField(upload_to='reports/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     space_name = models.CharField(max_length=255, blank=True, null=True)
     district = models.CharField(max_length=255, blank=True, null=True)
     street = models.CharField(max_length=255, blank=True, null=True)
     street_name_backup = models.CharField(max_length=255, blank=True, null=True)
+    # The Street the free-text street resolves to, set at intake (see streets.py)
+    resolved_street = models.ForeignKey(
+        Street, on_delete=models.SET_NULL, null=True, blank=True, db_index=False, related_name='reports',
+    )
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # Map grid cell of latitude/longitude, for area queries (see geo.py)
+    grid_cell = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    moderation_status = models.CharField(max_length=10, choices=MODERATION_CHOICES, default='pending')
+    moderation_reason = models.CharField(max_length=255, blank=True, null=True)
+    # {'thumb': {'webp': name, 'jpeg': name}, 'display': {...}}, see images.py
+    file_renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    objects = ReportQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Village chairmen's inboxes: a street's reports, newest first
+            models.Index(fields=['resolved_street', '-created_at'], name='report_street_created_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         is_new = not self.pk
-        if not self.report_id:
-            self.report_id = self._generate_unique_id()
-        super().save(*args, **kwargs)
-
-        if is_new and self.email:
-            try:
-                self._send_notification_email()
-            except Exception as e:
-                # Optionally log the error
-                print(f"Failed to send report notification: {e}")
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        if is_new and self.resolved_street_id is None:
+            from .streets import resolve_report_street
+            self.resolved_street_id = resolve_report_street(self)
+        if self.report_id:
+            super().save(*args, **kwargs)
+        else:
+            self._save_with_new_report_id(*args, **kwargs)
+
+        if is_new and self.moderation_status == 'pending':
+            # Image/text checks run on a worker (see moderation.py)
+            from .tasks import moderate_report_task
+            transaction.on_commit(
+                lambda: moderate_report_task.delay(self.pk),
+                robust=True,
+            )
+
+        if is_new and self.file:
+            from .tasks import generate_image_renditions_task
+            transaction.on_commit(
+                lambda: generate_image_renditions_task.delay('myapp.Report', self.pk),
+                robust=True,
+            )
+
+        if is_new and self.email and self.moderation_status == 'approved':
+            # Pending reports are acknowledged by moderate_report_task once
+            # approved. Queue after commit so the request never blocks on SMTP.
+            self.queue_acknowledgement()
+
+    def queue_acknowledgement(self):
+        from .tasks import send_report_acknowledgement_task
+        transaction.on_commit(
+            lambda: send_report_acknowledgement_task.delay(self.pk),
+            robust=True,
+        )
 
 
     def _generate_unique_id(self):
-        # Generate a unique 8-character ID
-        unique_id = uuid.uuid4().hex[:8].upper()
-        # Check if ID already exists, if so, generate a new one
-        while Report.objects.filter(report_id=unique_id).exists():
-            unique_id = uuid.uuid4().hex[:8].upper()
-        return unique_id
+        return generate_report_id()
+
+    def _save_with_new_report_id(self, *args, **kwargs):
+        # No exists() probe: the unique index on report_id decides, and a
+        # collision just means trying again with a fresh ID.
+        for attempt in range(REPORT_ID_MAX_ATTEMPTS):
+            self.report_id = self._generate_unique_id()
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError as e:
+                # Any other constraint failure is not ours to retry
+                if not _is_report_id_clash(e) or attempt == REPORT_ID_MAX_ATTEMPTS - 1:
+                    raise
     
     def _send_notification_email(self):
         subject = f'Report Received - ID: {self.report_id}'
@@ -131,6 +209,44 @@ class Report(models.Model):
             fail_silently=False,
         )
 
+class UploadSession(models.Model):
+    """A resumable chunked upload (see uploads.py and views.ChunkedUploadView)."""
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True)
+    file_path = models.CharField(max_length=500, blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    # Set while a PUT streams the chunk at received_size, so the row lock
+    # is not held for the transfer; a stale lease can be taken over
+    chunk_lease_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+
+class StoredBlob(models.Model):
+    """Reference count for a file in the content-addressed media store (see storage.py)."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)
+    checked = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
 class ReportReply(models.Model):
     report = models.ForeignKey('Report', on_delete=models.CASCADE, related_name='replies')
     message = models.TextField()
@@ -146,6 +262,7 @@ class CustomUser(AbstractUser):
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='user')
     profile_image = models.ImageField(upload_to='profile_images/', null=True, blank=True)
+    profile_image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     ward = models.ForeignKey(Ward, on_delete=models.SET_NULL, null=True, blank=True)
     street = models.ForeignKey(Street, on_delete=models.SET_NULL, null=True, blank=True)
     
@@ -170,24 +287,47 @@ class OpenSpace(models.Model):
     name = models.CharField(max_length=255)
     latitude = models.FloatField()
     longitude = models.FloatField()
-    district = models.ForeignKey(Ward, on_delete=models.CASCADE, related_name='openspaces')
+    # Map grid cell of latitude/longitude, for nearby-space queries (see geo.py)
+    grid_cell = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
+    district = models.ForeignKey(Ward, on_delete=models.CASCADE, related_name='openspaces', db_index=False)
     street = models.ForeignKey(Street, on_delete=models.CASCADE, related_name='openspaces', blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
-    
+
+    class Meta:
+        indexes = [
+            # Ward dashboards and maps: a ward's spaces by status
+            models.Index(fields=['district', 'status'], name='openspace_district_status_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
+class OpenSpaceBookingQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Bookings ready for OpenSpaceBookingSerializer: the space is joined in
+        (for its name) so a page is one query, not one per row. The serializer
+        reads every booking column, so there is nothing to project away.
+        """
+        return self.select_related('space')
+
+
 class OpenSpaceBooking(models.Model):
 
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('accepted', 'Accepted'),
         ('rejected', 'Rejected'),
+        ('completed', 'Completed'),
     ]
     space = models.ForeignKey(OpenSpace, on_delete=models.CASCADE)
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
     username = models.CharField(max_length=150)
     contact = models.CharField(max_length=20)
     startdate = models.DateField()
@@ -196,12 +336,42 @@ class OpenSpaceBooking(models.Model):
     district = models.CharField(max_length=250, default='Kinondoni')
     file = models.FileField(upload_to='bookings/files/', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
 
+    objects = OpenSpaceBookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # "My bookings", newest first (cursor pagination)
+            models.Index(fields=['user', '-created_at'], name='booking_user_created_idx'),
+            # Ward executives' booking lists and dashboard counts
+            models.Index(fields=['district', 'status'], name='booking_district_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} - {self.startdate}"
     
     
+class SpaceOccupancy(models.Model):
+    """One row per day an open space is held by a booking (see reservations.py)."""
+    space = models.ForeignKey(OpenSpace, on_delete=models.CASCADE, related_name='occupancy')
+    day = models.DateField()
+    booking = models.ForeignKey(OpenSpaceBooking, on_delete=models.CASCADE, related_name='occupied_days')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['space', 'day'], name='unique_space_day'),
+        ]
+        indexes = [
+            # Ward- or city-wide range scans: which spaces are taken on these days
+            models.Index(fields=['day', 'space'], name='occupancy_day_space_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.space_id} @ {self.day}"
+
+
 class ForwardedBooking(models.Model):
     booking = models.OneToOneField(OpenSpaceBooking, on_delete=models.CASCADE, related_name='forwarded_booking')
     ward_executive_description = models.TextField()
@@ -219,6 +389,12 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Unread badge counts; read notifications are the bulk and never counted
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='notification_unread_idx'),
+        ]
+
     def __str__(self):
         return f'Notification for {self.user.username}'
     
@@ -240,10 +416,17 @@ class ReportForward(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
         null=True,
-        related_name='reports_received'
+        related_name='reports_received',
+        db_index=False,
     )
     forwarded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Ward executives' inbox, newest first
+            models.Index(fields=['to_user', '-forwarded_at'], name='forward_to_user_idx'),
+        ]
+
     def __str__(self):
         return f"Report {self.report.report_id} from {self.from_user} to {self.to_user}"
 
@@ -296,7 +479,8 @@ class ReportForwardToadmin(models.Model):
     report = models.ForeignKey(
         'Report',
         on_delete=models.CASCADE,
-        related_name='forwards_to_admin'
+        related_name='forwards_to_admin',
+        db_index=False,
     )
     from_user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -308,10 +492,88 @@ class ReportForwardToadmin(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
         null=True,
-        related_name='reports_received_by_admin'
+        related_name='reports_received_by_admin',
+        db_index=False,
     )
     message = models.TextField(blank=True, null=True)
     forwarded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # "Has this executive already escalated this report?"
+            models.Index(fields=['report', 'from_user'], name='forward_admin_report_from_idx'),
+            # Admins' inbox, newest first
+            models.Index(fields=['to_user', '-forwarded_at'], name='forward_admin_to_user_idx'),
+        ]
+
     def __str__(self):
         return f"Report {self.report.report_id} from {self.from_user} to {self.to_user}"
+
+
+class Broadcast(models.Model):
+    """One email sent to many recipients; each copy is an OutboundMessage."""
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.subject} ({self.created_at:%Y-%m-%d})"
+
+
+class OutboundMessage(models.Model):
+    """An SMS or email waiting to be delivered by the outbox drainer (see outbox.py)."""
+    CHANNEL_CHOICES = [
+        ('sms', 'SMS'),
+        ('email', 'Email'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # When the drainer may (re)try it; while 'sending' this is the claim's lease
+    next_attempt_at = models.DateTimeField(default=now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, null=True, blank=True, related_name='messages')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', 'status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
+
+
+class DailyStat(models.Model):
+    """One counter per metric, day and ward, rebuilt by rollups.py ('' = no ward)."""
+    METRIC_CHOICES = [
+        ('reports', 'Reports'),
+        ('bookings', 'Bookings'),
+        ('forwards', 'Reports forwarded to ward executives'),
+        ('escalations', 'Reports forwarded to admin'),
+        ('ussd_reports', 'USSD reports'),
+    ]
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    day = models.DateField()
+    ward = models.CharField(max_length=255, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'day', 'ward'], name='dailystat_metric_day_ward'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.day} {self.ward or '-'}: {self.count}"
@@ -0,0 +1,149 @@
+"""
+Report moderation backends.
+
+Reports are saved in the 'pending' moderation state and checked by
+tasks.moderate_report_task on a Celery worker. The backend is chosen with
+settings.MODERATION_BACKEND so the pipeline can run against Sightengine in
+production and fully offline in development and tests.
+
+Verdicts are cached by content (SHA-256 of the file bytes or of the
+normalized text) in the 'moderation' cache, so the same photo uploaded by
+many citizens is only sent to the backend once.
+"""
+import hashlib
+import logging
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+VERDICT_CACHE_ALIAS = 'moderation'
+
+
+class BaseModerationBackend:
+    def is_explicit_image(self, file_path):
+        """
+        file_path is relative to MEDIA_ROOT, as stored on Report.file. Raise
+        FileNotFoundError if it cannot be read; the task retries rather than
+        passing an image nobody has looked at.
+        """
+        raise NotImplementedError
+
+    def is_inappropriate_text(self, text):
+        raise NotImplementedError
+
+
+class SightengineBackend(BaseModerationBackend):
+    """Remote checks through the Sightengine API (see myapp.utils)."""
+
+    def is_explicit_image(self, file_path):
+        from .utils import is_explicit_image
+        return is_explicit_image(file_path)
+
+    def is_inappropriate_text(self, text):
+        from .utils import is_inappropriate_text
+        return is_inappropriate_text(text)
+
+
+class LocalModerationBackend(BaseModerationBackend):
+    """
+    Network-free backend: better_profanity for text and a skin-tone pixel
+    ratio heuristic (Pillow) for images. Crude, but good enough to exercise
+    the pipeline locally.
+    """
+    SAMPLE_SIZE = (64, 64)
+    SKIN_RATIO_THRESHOLD = 0.6
+
+    def __init__(self):
+        from better_profanity import profanity # type: ignore
+        profanity.load_censor_words()
+        self._profanity = profanity
+
+    def is_explicit_image(self, file_path):
+        from PIL import Image, UnidentifiedImageError
+
+        full_path = os.path.join(settings.MEDIA_ROOT, str(file_path))
+        try:
+            with Image.open(full_path) as image:
+                sample = image.convert('YCbCr').resize(self.SAMPLE_SIZE)
+        except UnidentifiedImageError:
+            # Non-images (PDFs) have nothing to classify
+            return False
+
+        pixels = list(sample.getdata())
+        skin = sum(1 for _, cb, cr in pixels if 77 <= cb <= 127 and 133 <= cr <= 173)
+        return skin / len(pixels) >= self.SKIN_RATIO_THRESHOLD
+
+    def is_inappropriate_text(self, text):
+        return self._profanity.contains_profanity(text or '')
+
+
+def normalize_text(text):
+    return ' '.join((text or '').casefold().split())
+
+
+def text_digest(text):
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+def file_digest(file_path, chunk_size=64 * 1024):
+    """SHA-256 of a stored file, or None if it is missing."""
+    digest = hashlib.sha256()
+    try:
+        with default_storage.open(str(file_path), 'rb') as fh:
+            for chunk in iter(lambda: fh.read(chunk_size), b''):
+                digest.update(chunk)
+    except (FileNotFoundError, OSError):
+        return None
+    return digest.hexdigest()
+
+
+class CachedModerationBackend(BaseModerationBackend):
+    """Wraps another backend and memoizes its verdicts by content hash."""
+
+    def __init__(self, backend, cache_alias=VERDICT_CACHE_ALIAS):
+        self.backend = backend
+        self.cache_alias = cache_alias
+        self.namespace = type(backend).__name__
+
+    def is_explicit_image(self, file_path):
+        return self._verdict(
+            'image', file_digest(file_path), lambda: self.backend.is_explicit_image(file_path)
+        )
+
+    def is_inappropriate_text(self, text):
+        return self._verdict(
+            'text', text_digest(text), lambda: self.backend.is_inappropriate_text(text)
+        )
+
+    def _verdict(self, kind, digest, compute):
+        if digest is None:
+            return compute()
+
+        cache = caches[self.cache_alias]
+        key = f'{self.namespace}:{kind}:{digest}'
+        try:
+            cached = cache.get(key)
+        except Exception as e:
+            # A cache outage must never block moderation
+            logger.warning("Moderation cache read failed: %s", e)
+            return compute()
+        if cached is not None:
+            return cached
+
+        verdict = bool(compute())
+        try:
+            cache.set(key, verdict)
+        except Exception as e:
+            logger.warning("Moderation cache write failed: %s", e)
+        return verdict
+
+
+@lru_cache(maxsize=None)
+def get_moderation_backend():
+    return CachedModerationBackend(import_string(settings.MODERATION_BACKEND)())
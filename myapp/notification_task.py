@@ -1,21 +1,36 @@
 from celery import shared_task
+from django.db import transaction
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
-from .models import OpenSpaceBooking
-from .sms_utils import send_sms
+from .models import OpenSpace, OpenSpaceBooking
+from .reservations import refresh_space_status
+from . import outbox
+
 
 @shared_task
 def check_expired_bookings_task():
+    """
+    Nightly sweep: accepted bookings whose last day has passed become
+    'completed', spaces with nothing left booked become available again, and
+    the goodbye SMS are queued in the outbox. A fixed number of queries
+    however many bookings ended, and a second run finds nothing to do.
+    """
     today = now().date()
-    expired_bookings = OpenSpaceBooking.objects.filter(
-        enddate__lte=today,
-        status='accepted'
-    )
+    with transaction.atomic():
+        expired = OpenSpaceBooking.objects.select_for_update(of=('self',)).alias(
+            last_day=Coalesce('enddate', 'startdate'),
+        ).filter(
+            last_day__lt=today,
+            status='accepted'
+        )
+        ended = list(expired.values_list('pk', 'username', 'contact', 'space__name'))
+        OpenSpaceBooking.objects.filter(pk__in=[pk for pk, *_ in ended]).update(status='completed', updated_at=now())
 
-    for booking in expired_bookings:
-        # Update space availability
-        booking.space.status = 'available'
-        booking.space.save()
+        # Also frees spaces whose pending bookings lapsed without a decision
+        refresh_space_status(OpenSpace.objects.filter(status='unavailable').values('pk'))
 
-        # Notify user
-        message = f"Hello {booking.username}, your booking for {booking.space.name} has ended today. Thank you!"
-        send_sms(booking.contact, message)
\ No newline at end of file
+        outbox.enqueue_sms_many(
+            (contact, f"Hello {username}, your booking for {space_name} has ended. Thank you!")
+            for _, username, contact, space_name in ended
+        )
+    return len(ended)
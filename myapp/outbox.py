@@ -0,0 +1,235 @@
+"""
+Transactional outbox for SMS and email.
+
+Request handlers never talk to the SMS gateway or SMTP. They call
+enqueue_sms() / enqueue_email() inside the transaction that changes state,
+so the message is stored if and only if the change commits. After commit a
+drain_outbox_task is queued for the channel, and a beat entry sweeps every
+minute in case that kick was lost.
+
+A drainer claims a batch of due rows with SELECT ... FOR UPDATE SKIP LOCKED
+and marks them 'sending' with a lease. It then delivers them outside the
+transaction: SMS with the same text share gateway requests, and each batch
+of emails shares one SMTP connection. A failed message is retried with
+backoff until OUTBOX_MAX_ATTEMPTS, then it is dead-lettered ('dead') for an
+admin to look at. Rows whose lease ran out (worker crashed mid-send) are picked up
+again, so delivery is at-least-once.
+
+OUTBOX_CONCURRENCY caps how many drainers run per channel at once, to
+stay inside the gateway's and the mail server's limits. The cap is kept in
+the cache; if the cache is down, drainers run uncapped rather than stop.
+"""
+import logging
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from . import sms_gateway
+from .models import Broadcast, OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('sms', 'email')
+LEASE_EXPIRED = 'Lease expired before delivery finished'
+
+
+def _kick(channel):
+    from .tasks import drain_outbox_task
+    transaction.on_commit(lambda: drain_outbox_task.delay(channel), robust=True)
+
+
+def enqueue_sms(phone, message):
+    if not phone:
+        return None
+    row = OutboundMessage.objects.create(channel='sms', recipient=phone, body=message)
+    _kick('sms')
+    return row
+
+
+def enqueue_sms_many(messages):
+    """Queue many (phone, message) pairs with one INSERT."""
+    rows = OutboundMessage.objects.bulk_create(
+        OutboundMessage(channel='sms', recipient=phone, body=message)
+        for phone, message in messages
+        if phone
+    )
+    if rows:
+        _kick('sms')
+    return rows
+
+
+def enqueue_email(recipient, subject, body, from_email=None):
+    if not recipient:
+        return None
+    row = OutboundMessage.objects.create(
+        channel='email', recipient=recipient, subject=subject, body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+    _kick('email')
+    return row
+
+
+def enqueue_broadcast(recipients, subject, body, created_by=None):
+    """Queue one email to many recipients with one INSERT; returns the Broadcast."""
+    broadcast = Broadcast.objects.create(subject=subject, message=body, created_by=created_by)
+    OutboundMessage.objects.bulk_create(
+        OutboundMessage(
+            channel='email', recipient=recipient, subject=subject, body=body,
+            from_email=settings.DEFAULT_FROM_EMAIL, broadcast=broadcast,
+        )
+        for recipient in dict.fromkeys(r for r in recipients if r)
+    )
+    _kick('email')
+    return broadcast
+
+
+def claim(channel, limit):
+    """Take up to `limit` due messages for this drainer."""
+    current = now()
+    with transaction.atomic():
+        rows = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True)
+            .filter(channel=channel, status__in=('pending', 'sending'), next_attempt_at__lte=current)
+            .order_by('next_attempt_at', 'id')[:limit]
+        )
+        # A 'sending' row here outlived its lease: the worker that had it
+        # died mid-send, which counts as an attempt. Otherwise a message
+        # that crashes the worker would be retried forever.
+        for row in rows:
+            if row.status == 'sending':
+                row.attempts += 1
+                row.last_error = LEASE_EXPIRED
+        stale = [row for row in rows if row.status == 'sending']
+        dead = [row for row in stale if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS]
+        for row in dead:
+            logger.error('Outbox message %s dead after %s attempts: %s', row.pk, row.attempts, LEASE_EXPIRED)
+        OutboundMessage.objects.filter(pk__in=[row.pk for row in dead]).update(
+            status='dead', attempts=F('attempts') + 1, last_error=LEASE_EXPIRED,
+        )
+        OutboundMessage.objects.filter(pk__in=[row.pk for row in stale if row not in dead]).update(
+            attempts=F('attempts') + 1, last_error=LEASE_EXPIRED,
+        )
+        rows = [row for row in rows if row not in dead]
+        OutboundMessage.objects.filter(pk__in=[row.pk for row in rows]).update(
+            status='sending', next_attempt_at=current + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS),
+        )
+    return rows
+
+
+def _mark_sent(rows):
+    OutboundMessage.objects.filter(pk__in=[row.pk for row in rows]).update(
+        status='sent', sent_at=now(), last_error='',
+    )
+
+
+def _mark_failed(row, error):
+    attempts = row.attempts + 1
+    if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        logger.error('Outbox message %s dead after %s attempts: %s', row.pk, attempts, error)
+        fields = {'status': 'dead'}
+    else:
+        delay = settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1) * random.uniform(0.5, 1.5)
+        fields = {'status': 'pending', 'next_attempt_at': now() + timedelta(seconds=delay)}
+    OutboundMessage.objects.filter(pk=row.pk).update(attempts=attempts, last_error=str(error)[:1000], **fields)
+
+
+def _deliver_sms(rows):
+    by_body = defaultdict(list)
+    for row in rows:
+        by_body[row.body].append(row)
+    for body, group in by_body.items():
+        try:
+            sms_gateway.send_bulk([row.recipient for row in group], body)
+        except Exception as e:
+            for row in group:
+                _mark_failed(row, e)
+        else:
+            _mark_sent(group)
+
+
+def _deliver_email(rows):
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as e:
+        for row in rows:
+            _mark_failed(row, e)
+        return
+    try:
+        for row in rows:
+            message = EmailMessage(row.subject, row.body, row.from_email or None, [row.recipient], connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                _mark_failed(row, e)
+            else:
+                _mark_sent([row])
+    finally:
+        connection.close()
+
+
+DELIVER = {'sms': _deliver_sms, 'email': _deliver_email}
+
+
+def _acquire_slot(channel):
+    """
+    A drain slot key for this channel, None if all slots are taken, or ''
+    if the cache is down: then drain without the cap (SKIP LOCKED still
+    keeps drainers off each other's rows) rather than stop delivery.
+    """
+    timeout = settings.OUTBOX_LEASE_SECONDS
+    try:
+        for slot in range(settings.OUTBOX_CONCURRENCY[channel]):
+            key = f'outbox:drain:{channel}:{slot}'
+            if cache.add(key, 1, timeout):
+                return key
+    except Exception:
+        logger.warning('Outbox slot cache unavailable; draining %s without the cap', channel, exc_info=True)
+        return ''
+    return None
+
+
+def _keep_slot(key):
+    """Extend the slot for another lease; False if it already expired (and may be someone else's)."""
+    try:
+        return cache.touch(key, settings.OUTBOX_LEASE_SECONDS)
+    except Exception:
+        logger.warning('Could not extend outbox slot %s', key, exc_info=True)
+        return True
+
+
+def _release_slot(key):
+    try:
+        cache.delete(key)
+    except Exception:
+        logger.warning('Could not release outbox slot %s', key, exc_info=True)
+
+
+def drain(channel):
+    """Deliver due messages for one channel; returns how many were attempted."""
+    key = _acquire_slot(channel)
+    if key is None:
+        return 0  # enough drainers already at work on this channel
+    attempted = 0
+    try:
+        while True:
+            # The slot lasts one lease; extend it before every batch, and
+            # stop if it ran out so no more than the cap keep draining
+            if key and not _keep_slot(key):
+                key = None
+                return attempted
+            rows = claim(channel, settings.OUTBOX_BATCH_SIZE)
+            if not rows:
+                return attempted
+            DELIVER[channel](rows)
+            attempted += len(rows)
+    finally:
+        if key:
+            _release_slot(key)
@@ -0,0 +1,34 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class BookingCursorPagination(CursorPagination):
+    """
+    Keyset pagination for booking lists, newest first.
+
+    The cursor holds the last seen created_at (ties on the same timestamp are
+    broken by id), so each page is an indexed range scan instead of an
+    OFFSET, and rows booked while a client is paging do not shift its pages.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class ForwardCursorPagination(BookingCursorPagination):
+    """The same, for report forwarding inboxes (newest forward first)."""
+    ordering = ('-forwarded_at', '-id')
+
+
+class SearchPagination(PageNumberPagination):
+    """Search results are ordered by rank, which a cursor cannot follow; page numbers it is."""
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def paginated_response(paginator_class, queryset, serializer_class, request, view):
+    paginator = paginator_class()
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
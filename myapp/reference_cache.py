@@ -0,0 +1,82 @@
+"""
+Cached ward and street lists.
+
+Wards and streets change a few times a year but are read by every client at
+start-up. Each list is cached under the current reference-data version; any
+save or delete of a Ward or Street bumps the version (see signals.py), so
+stale entries are simply never read again and age out with their TTL.
+
+The version is also the ETag, so a client that already has the current lists
+gets a 304 without the cache entry or the database being touched. If Redis
+is down the lists are read straight from the database.
+"""
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from . import conditional
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'refdata:version'
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a flushed cache never reuses an old version
+        cache.add(VERSION_KEY, int(time.time()), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time()), None)
+    except Exception:
+        logger.warning('Could not invalidate cached reference data', exc_info=True)
+
+
+def cached(name, build, version=None):
+    """
+    build()'s result, cached under the current version as `name`. If Redis
+    fails at any point the result is built from the database, uncached.
+    """
+    try:
+        version = current_version() if version is None else version
+        key = f'refdata:{version}:{hashlib.sha1(name.encode()).hexdigest()[:12]}'
+        data = cache.get(key)
+    except Exception:
+        logger.warning('Reference data cache unavailable; reading from the database', exc_info=True)
+        return build()
+    if data is None:
+        data = build()
+        try:
+            cache.set(key, data, settings.REFERENCE_CACHE_TTL)
+        except Exception:
+            logger.warning('Could not cache reference data', exc_info=True)
+    return data
+
+
+def reference_response(request, name, build):
+    """
+    Respond with build()'s result, cached as `name` (which must identify the
+    list, e.g. include the ward it is for).
+    """
+    try:
+        version = current_version()
+    except Exception:
+        logger.warning('Reference data cache unavailable; reading from the database', exc_info=True)
+        return Response(build())
+
+    digest = hashlib.sha1(name.encode()).hexdigest()[:12]
+    etag = conditional.make_etag('ref', version, digest)
+    if conditional.not_modified(request, etag):
+        return conditional.not_modified_response(etag)
+    return conditional.with_etag(Response(cached(name, build, version)), etag)
@@ -0,0 +1,69 @@
+"""
+Report ID allocation.
+
+IDs are 12-character Crockford base32 strings built snowflake-style from a
+millisecond timestamp, a per-process node number and a per-millisecond
+sequence, so they sort by creation time and can be minted without asking the
+database whether they are taken. The unique index on Report.report_id is the
+final guard: Report.save() retries with a fresh ID on the (practically
+impossible) collision instead of doing check-then-insert.
+"""
+import os
+import secrets
+import threading
+import time
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32, no I/L/O/U
+REPORT_ID_LENGTH = 12
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+TIMESTAMP_BITS = 41       # ~69 years of milliseconds
+NODE_BITS = 10
+SEQUENCE_BITS = 9
+
+_MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+_lock = threading.Lock()
+_state = {'pid': None, 'node': 0, 'last_ms': -1, 'sequence': 0}
+
+
+def _encode(value, length=REPORT_ID_LENGTH):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def _current_ms():
+    return int(time.time() * 1000) - EPOCH_MS
+
+
+def generate_report_id():
+    """Return a new, time-ordered report ID. Thread- and fork-safe."""
+    with _lock:
+        pid = os.getpid()
+        if _state['pid'] != pid:
+            # Fresh process (or a forked gunicorn/celery worker): pick a new node
+            _state.update(pid=pid, node=secrets.randbits(NODE_BITS), last_ms=-1, sequence=0)
+
+        now = _current_ms()
+        if now < _state['last_ms']:
+            # Clock stepped backwards; keep counting from the last timestamp we used
+            now = _state['last_ms']
+
+        if now == _state['last_ms']:
+            _state['sequence'] = (_state['sequence'] + 1) & _MAX_SEQUENCE
+            if _state['sequence'] == 0:
+                # Sequence exhausted for this millisecond, borrow the next one
+                now = _state['last_ms'] + 1
+        else:
+            _state['sequence'] = 0
+
+        _state['last_ms'] = now
+        value = (
+            (now << (NODE_BITS + SEQUENCE_BITS))
+            | (_state['node'] << SEQUENCE_BITS)
+            | _state['sequence']
+        )
+    return _encode(value)
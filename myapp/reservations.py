@@ -0,0 +1,105 @@
+"""
+Booking open spaces by date range.
+
+A booking holds its space from startdate to enddate (inclusive; a booking
+without an enddate holds just its startdate) while it is pending or
+accepted. The held days are kept in SpaceOccupancy, one row per space and
+day, so "is this space free" and "which spaces are free" are single
+indexed lookups, and the unique (space, day) constraint makes a double
+booking impossible even if a caller skips this module.
+
+Every write that can change which days are held locks the space row
+first, so two requests for the same space are serialized and the
+availability check cannot be raced.
+
+OpenSpace.status is kept as a summary for older clients: 'unavailable'
+while the space has a held day today or later.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils.timezone import now
+
+from .models import OpenSpace, OpenSpaceBooking, SpaceOccupancy
+
+# Bookings in these states hold their dates
+HOLDING_STATUSES = ('pending', 'accepted')
+# Longest booking, in days; each held day is one SpaceOccupancy row
+MAX_BOOKING_DAYS = 31
+
+
+class BookingConflict(Exception):
+    pass
+
+
+def booking_days(startdate, enddate=None):
+    enddate = enddate or startdate
+    return [startdate + timedelta(days=n) for n in range((enddate - startdate).days + 1)]
+
+
+def occupied(startdate, enddate=None):
+    """Occupancy rows between startdate and enddate (inclusive)."""
+    return SpaceOccupancy.objects.filter(day__range=(startdate, enddate or startdate))
+
+
+def with_availability(spaces, startdate, enddate=None):
+    """Annotate each space with `is_free` for the given dates (one query)."""
+    taken = occupied(startdate, enddate).filter(space=OuterRef('pk'))
+    return spaces.annotate(is_free=~Exists(taken))
+
+
+def refresh_space_status(space_ids):
+    """Recompute OpenSpace.status for the given spaces in two UPDATEs."""
+    held = SpaceOccupancy.objects.filter(space=OuterRef('pk'), day__gte=now().date())
+    spaces = OpenSpace.objects.filter(pk__in=space_ids)
+    spaces.filter(Exists(held)).exclude(status='unavailable').update(status='unavailable')
+    spaces.filter(~Exists(held)).exclude(status='available').update(status='available')
+
+
+def _occupy(space, booking):
+    clashes = occupied(booking.startdate, booking.enddate).filter(space=space)
+    if clashes.exclude(booking=booking).exists():
+        raise BookingConflict(f'{space.name} is already booked for some of these dates.')
+    SpaceOccupancy.objects.bulk_create(
+        SpaceOccupancy(space=space, day=day, booking=booking)
+        for day in booking_days(booking.startdate, booking.enddate)
+    )
+
+
+def reserve(space_id, **fields):
+    """Create a pending booking, or raise BookingConflict."""
+    with transaction.atomic():
+        space = OpenSpace.objects.select_for_update().get(pk=space_id)
+        booking = OpenSpaceBooking.objects.create(space=space, **fields)
+        _occupy(space, booking)
+        refresh_space_status([space.pk])
+    return booking
+
+
+def set_status(booking, new_status):
+    """
+    Move a booking to a new status. Accepting re-checks the dates, since a
+    rejected booking may have been given away in the meantime.
+    """
+    with transaction.atomic():
+        space = OpenSpace.objects.select_for_update().get(pk=booking.space_id)
+        # The caller's copy may predate a change made while we waited for the lock
+        booking.refresh_from_db(fields=['status'])
+        was_holding = booking.status in HOLDING_STATUSES
+        if new_status in HOLDING_STATUSES and not was_holding:
+            _occupy(space, booking)
+        elif was_holding and new_status not in HOLDING_STATUSES:
+            SpaceOccupancy.objects.filter(booking=booking).delete()
+        OpenSpaceBooking.objects.filter(pk=booking.pk).update(status=new_status, updated_at=now())
+        booking.status = new_status
+        refresh_space_status([space.pk])
+    return booking
+
+
+def cancel(booking):
+    """Delete a booking and give its dates back."""
+    with transaction.atomic():
+        OpenSpace.objects.select_for_update().filter(pk=booking.space_id).first()
+        booking.delete()
+        refresh_space_status([booking.space_id])
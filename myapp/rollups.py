@@ -0,0 +1,122 @@
+"""
+Per-day, per-ward counters for the admin statistics charts.
+
+Charts read DailyStat instead of counting Report, OpenSpaceBooking and the
+forward tables on every page load. rollup() rebuilds the counters for a
+range of days from the source tables with one grouped COUNT per metric, so
+it is idempotent and also picks up deletions. The beat entry
+rollup-statistics re-runs it for the last couple of days every few minutes;
+older days only change through the rollup_statistics management command
+(backfills, corrections). Today's counters therefore lag by at most one
+beat interval.
+
+Metrics are grouped by ward name, as stored on the source rows; USSD reports
+carry no ward and are counted under ''. Reports rejected by moderation are
+not counted.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils.timezone import localdate, make_aware
+
+from .models import DailyStat, OpenSpaceBooking, Report, ReportForward, ReportForwardToadmin, UssdReport
+
+# metric: (source rows, timestamp field, ward name field)
+SOURCES = {
+    'reports': (Report.objects.visible(), 'created_at', 'district'),
+    'bookings': (OpenSpaceBooking.objects.all(), 'created_at', 'district'),
+    'forwards': (ReportForward.objects.all(), 'forwarded_at', 'report__district'),
+    'escalations': (ReportForwardToadmin.objects.all(), 'forwarded_at', 'report__district'),
+    'ussd_reports': (UssdReport.objects.all(), 'created_at', None),
+}
+
+
+def day_bounds(first_day, last_day):
+    """
+    (start, end) datetimes covering first_day..last_day (local dates,
+    inclusive): filter with __gte start and __lt end. Unlike __date lookups,
+    which cast every row, a plain range on the column can use its index.
+    """
+    start = make_aware(datetime.combine(first_day, time.min))
+    end = make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    return start, end
+
+
+def daily_counts(metric, first_day, last_day):
+    """(day, ward, count) rows for one metric, counted from its source table."""
+    rows, timestamp, ward = SOURCES[metric]
+    ward_name = Coalesce(F(ward), Value('')) if ward else Value('')
+    start, end = day_bounds(first_day, last_day)
+    return (
+        rows
+        .filter(**{f'{timestamp}__gte': start, f'{timestamp}__lt': end})
+        .annotate(stat_day=TruncDate(timestamp), stat_ward=ward_name)
+        .values_list('stat_day', 'stat_ward')
+        .annotate(n=Count('pk'))
+        .order_by()
+    )
+
+
+def rollup(first_day, last_day=None, metrics=None):
+    """Rebuild the counters for first_day..last_day (inclusive); returns rows written."""
+    last_day = last_day or localdate()
+    written = 0
+    for metric in metrics or SOURCES:
+        rows = [
+            DailyStat(metric=metric, day=day, ward=ward, count=n)
+            for day, ward, n in daily_counts(metric, first_day, last_day)
+        ]
+        with transaction.atomic():
+            DailyStat.objects.filter(metric=metric, day__range=(first_day, last_day)).delete()
+            DailyStat.objects.bulk_create(rows)
+        written += len(rows)
+    return written
+
+
+def rollup_recent(days=2):
+    """Rebuild the last `days` days, so rows written around midnight still reach yesterday."""
+    today = localdate()
+    return rollup(today - timedelta(days=days - 1), today)
+
+
+INTERVALS = ('day', 'month')
+
+
+def _periods(first_day, last_day, interval):
+    if interval == 'day':
+        return [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+    periods = []
+    month = first_day.replace(day=1)
+    while month <= last_day:
+        periods.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return periods
+
+
+def series(first_day, last_day, metrics=None, ward=None, interval='day'):
+    """
+    {metric: [(period, count), ...]} from the counters, one entry per day or
+    month (first day of the month) in the range, zeros included. ward=None
+    sums all wards.
+    """
+    metrics = list(metrics or SOURCES)
+    stats = DailyStat.objects.filter(metric__in=metrics, day__range=(first_day, last_day))
+    if ward is not None:
+        stats = stats.filter(ward=ward)
+    period = F('day') if interval == 'day' else TruncMonth('day')
+    totals = {
+        (metric, when): total
+        for metric, when, total in (
+            stats.annotate(period=period)
+            .values_list('metric', 'period')
+            .annotate(total=Sum('count'))
+            .order_by()
+        )
+    }
+    periods = _periods(first_day, last_day, interval)
+    return {
+        metric: [(when, totals.get((metric, when), 0)) for when in periods]
+        for metric in metrics
+    }
@@ -0,0 +1,107 @@
+"""
+Ranked full-text search over reports (description, space name, street, ward).
+
+PostgreSQL: a GIN index on the same to_tsvector() expression the query uses
+(migration 0030), matched with websearch_to_tsquery, so "dumping mwenge" or
+"dumping -burning" behave as people expect. Space, street and ward names also
+match by trigram similarity (pg_trgm GIN indexes), which catches misspelt
+place names; the rank adds the best similarity to ts_rank.
+
+SQLite (local development): an FTS5 table kept in step with myapp_report by
+triggers, ranked with bm25(). Migrations that rebuild myapp_report drop
+those triggers, so ensure_sqlite_fts() recreates the table and triggers
+after every migrate (see signals.py).
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+SEARCH_FIELDS = ('description', 'space_name', 'street', 'district')
+# Short name fields that are worth fuzzy-matching
+TRIGRAM_FIELDS = ('space_name', 'street', 'district')
+
+FTS_TABLE = 'myapp_report_fts'
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+    # Must stay identical to the index expression in migration 0030
+    return SearchVector(*SEARCH_FIELDS, config='simple')
+
+
+def _postgres(reports, text):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+
+    query = SearchQuery(text, config='simple', search_type='websearch')
+    similarity = Greatest(*(TrigramWordSimilarity(Value(text), field) for field in TRIGRAM_FIELDS))
+    fuzzy = Q()
+    for field in TRIGRAM_FIELDS:
+        fuzzy |= Q(**{f'{field}__trigram_word_similar': text})
+    return (
+        reports
+        .annotate(search=search_vector())
+        .filter(Q(search=query) | fuzzy)
+        .annotate(rank=SearchRank(F('search'), query) + similarity)
+    )
+
+
+def fts5_query(text):
+    """Quote each word so user input can't break FTS5 syntax; words are ANDed, prefix-matched."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _sqlite(reports, text):
+    match = fts5_query(text)
+    if not match:
+        return reports.none().annotate(rank=Value(0.0, output_field=FloatField()))
+    matching = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,))
+    # bm25() is lower for better matches
+    rank = RawSQL(
+        f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = myapp_report.id',
+        (match,), output_field=FloatField(),
+    )
+    return reports.filter(pk__in=matching).annotate(rank=rank)
+
+
+def _fallback(reports, text):
+    matches = Q()
+    for field in SEARCH_FIELDS:
+        matches |= Q(**{f'{field}__icontains': text})
+    return reports.filter(matches).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+def search_reports(reports, text):
+    """`reports` filtered to those matching `text`, annotated with `rank` and best first."""
+    search = {'postgresql': _postgres, 'sqlite': _sqlite}.get(connection.vendor, _fallback)
+    return search(reports, text).order_by('-rank', '-created_at', '-id')
+
+
+def ensure_sqlite_fts(using_connection):
+    """Create the FTS5 table and its sync triggers if missing, then reindex."""
+    columns = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+    delete_old = (
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});"
+    with using_connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{columns}, content='myapp_report', content_rowid='id')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON myapp_report BEGIN {insert_new} END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON myapp_report BEGIN {delete_old} END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON myapp_report "
+            f"BEGIN {delete_old} {insert_new} END"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
@@ -1,6 +1,8 @@
 # serializers.py
 from rest_framework import serializers
 from .models import *
+from .images import rendition_urls
+from . import reservations
 
 class ReportReplySerializer(serializers.ModelSerializer):
     class Meta:
@@ -73,10 +75,11 @@ class ForwardedBookingSerializer(serializers.ModelSerializer):
 # serializers.py
 class UserProfileSerializer(serializers.ModelSerializer):
     profile_image = serializers.SerializerMethodField()
+    profile_image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
-        fields = ['username', 'email', 'role', 'profile_image']
+        fields = ['username', 'email', 'role', 'profile_image', 'profile_image_renditions']
 
     def get_profile_image(self, obj):
         request = self.context.get('request')
@@ -84,6 +87,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.profile_image.url)
         return None
 
+    def get_profile_image_renditions(self, obj):
+        return rendition_urls(obj.profile_image_renditions, self.context.get('request'))
+
 
 class OpenSpaceBookingSerializer(serializers.ModelSerializer):
     space_name = serializers.SerializerMethodField()
@@ -99,6 +105,16 @@ class OpenSpaceBookingSerializer(serializers.ModelSerializer):
     def get_space_name(self, obj):
         return obj.space.name if obj.space else None
 
+    def validate(self, attrs):
+        enddate = attrs.get('enddate')
+        if enddate and enddate < attrs['startdate']:
+            raise serializers.ValidationError({"enddate": "End date cannot be before the start date."})
+        if enddate and (enddate - attrs['startdate']).days >= reservations.MAX_BOOKING_DAYS:
+            raise serializers.ValidationError(
+                {"enddate": f"A booking can last at most {reservations.MAX_BOOKING_DAYS} days."}
+            )
+        return attrs
+
     def create(self, validated_data):
         request = self.context.get('request')
         space_id = request.data.get('space_id') if request else None
@@ -106,18 +122,14 @@ class OpenSpaceBookingSerializer(serializers.ModelSerializer):
         if not space_id:
             raise serializers.ValidationError({"space": "This field is required."})
 
+        validated_data.pop('space', None)
+        validated_data['user'] = request.user
         try:
-            space = OpenSpace.objects.get(id=space_id)
+            return reservations.reserve(space_id, **validated_data)
         except OpenSpace.DoesNotExist:
             raise serializers.ValidationError({"space": "Open space not found."})
-
-        if space.status == 'unavailable':
-            raise serializers.ValidationError({"space": "This open space has already been booked and is unavailable."})
-
-        validated_data.pop('space', None)
-        validated_data['user'] = request.user
-        booking = OpenSpaceBooking.objects.create(space=space, **validated_data)
-        return booking
+        except reservations.BookingConflict as e:
+            raise serializers.ValidationError({"space": str(e)})
 
 
 
@@ -157,14 +169,16 @@ class ProblemReportSerializer(serializers.ModelSerializer):
 
 
 class ReportSerializer(serializers.ModelSerializer):
+    # report_id is allocated by Report.save(), same as the GraphQL intake path
+    file_renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = Report
         fields = '__all__'
+        read_only_fields = ['moderation_status', 'moderation_reason', 'resolved_street']
 
-    def create(self, validated_data):
-        if 'report_id' not in validated_data:
-            validated_data['report_id'] = ''.join(random.choices(string.digits, k=8))
-        return super().create(validated_data)
+    def get_file_renditions(self, obj):
+        return rendition_urls(obj.file_renditions, self.context.get('request'))
 
 
 # class ReportReplySerializer(serializers.ModelSerializer):
@@ -0,0 +1,71 @@
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import reference_cache, search, storage
+from .models import CustomUser, OpenSpaceBooking, Report, ReportHistory, Street, Ward
+
+
+# Media reference counts (see storage.py): saving retains the names a row's
+# media fields now hold and releases the ones they held before; deleting
+# releases them all.
+@receiver(pre_save, sender=Report)
+@receiver(pre_save, sender=ReportHistory)
+@receiver(pre_save, sender=OpenSpaceBooking)
+@receiver(pre_save, sender=CustomUser)
+def read_stored_media_names(sender, instance, update_fields=None, **kwargs):
+    fields = _saved_media_fields(sender, instance, update_fields)
+    row = {}
+    if fields and not instance._state.adding:
+        row = sender._default_manager.filter(pk=instance.pk).values(*fields).first() or {}
+    instance._stored_media_names = {field: Counter(storage.media_names(row.get(field))) for field in fields}
+
+
+@receiver(post_save, sender=Report)
+@receiver(post_save, sender=ReportHistory)
+@receiver(post_save, sender=OpenSpaceBooking)
+@receiver(post_save, sender=CustomUser)
+def update_media_references(sender, instance, **kwargs):
+    before = instance.__dict__.pop('_stored_media_names', {})
+    after = storage.field_names(instance, before)
+    added, removed = Counter(), Counter()
+    for field, names in after.items():
+        added += names - before[field]
+        removed += before[field] - names
+    # Retain first, so a name that only moved between fields never hits zero
+    storage.retain(added)
+    storage.release(removed)
+
+
+@receiver(post_delete, sender=Report)
+@receiver(post_delete, sender=ReportHistory)
+@receiver(post_delete, sender=OpenSpaceBooking)
+@receiver(post_delete, sender=CustomUser)
+def release_media(sender, instance, **kwargs):
+    names = storage.field_names(instance, storage.MEDIA_FIELDS[sender._meta.label])
+    storage.release(sum(names.values(), Counter()))
+
+
+def _saved_media_fields(sender, instance, update_fields):
+    # Only fields this save writes: loaded ones, limited to update_fields
+    return [
+        field for field in storage.MEDIA_FIELDS[sender._meta.label]
+        if field in instance.__dict__ and (update_fields is None or field in update_fields)
+    ]
+
+
+@receiver(post_save, sender=Ward)
+@receiver(post_delete, sender=Ward)
+@receiver(post_save, sender=Street)
+@receiver(post_delete, sender=Street)
+def invalidate_reference_data(sender, **kwargs):
+    transaction.on_commit(reference_cache.invalidate)
+
+
+@receiver(post_migrate)
+def sync_report_search_table(sender, using, **kwargs):
+    # SQLite only: migrations that rebuild myapp_report drop the FTS triggers
+    if sender.label == 'myapp' and connections[using].vendor == 'sqlite':
+        search.ensure_sqlite_fts(connections[using])
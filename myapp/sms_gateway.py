@@ -0,0 +1,157 @@
+"""
+Outgoing SMS.
+
+Everything that texts users goes through send_sms() / send_bulk() here. The
+gateway class comes from settings.SMS_BACKEND, like moderation backends:
+
+    myapp.sms_gateway.BeemGateway   Beem Africa over one pooled requests.Session
+    myapp.sms_gateway.FakeGateway   records messages in memory (tests, local dev)
+
+Beem accepts many recipients per request, so send_bulk() sends one request
+per SMS_BATCH_SIZE numbers. Requests are paced by a token bucket
+(SMS_RATE_PER_SECOND, per process) and retried with jittered exponential
+backoff on timeouts, connection errors, 429 and 5xx.
+"""
+import logging
+import random
+import threading
+import time
+from functools import lru_cache
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SMSError(Exception):
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second on average, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            self.tokens -= 1
+        if wait:
+            self.sleep(wait)
+
+
+class BaseGateway:
+    def __init__(self):
+        self.bucket = TokenBucket(settings.SMS_RATE_PER_SECOND)
+
+    def send_bulk(self, phones, message):
+        """Send one message to many numbers; returns the gateway responses."""
+        phones = list(dict.fromkeys(p for p in phones if p))
+        size = settings.SMS_BATCH_SIZE
+        responses = []
+        for i in range(0, len(phones), size):
+            self.bucket.acquire()
+            responses.append(self._send_with_retry(phones[i:i + size], message))
+        return responses
+
+    def _send_with_retry(self, phones, message):
+        attempts = settings.SMS_MAX_RETRIES + 1
+        for attempt in range(attempts):
+            try:
+                return self.send_batch(phones, message)
+            except SMSError as e:
+                if not e.retryable or attempt == attempts - 1:
+                    raise
+                delay = settings.SMS_RETRY_BACKOFF * 2 ** attempt
+                delay *= random.uniform(0.5, 1.5)
+                logger.warning('SMS batch failed (%s); retrying in %.1fs', e, delay)
+                time.sleep(delay)
+
+    def send_batch(self, phones, message):
+        raise NotImplementedError
+
+
+class BeemGateway(BaseGateway):
+    url = 'https://apisms.beem.africa/v1/send'
+
+    # Unset, or still the value shipped in .env.example
+    PLACEHOLDER_SENDER_IDS = ('', 'YOUR_SENDER_ID')
+
+    def __init__(self):
+        if settings.BEEM_SENDER_ID in self.PLACEHOLDER_SENDER_IDS:
+            raise ImproperlyConfigured('BEEM_SENDER_ID must be set to the sender ID registered with Beem')
+        super().__init__()
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(settings.BEEM_API_KEY, settings.BEEM_SECRET_KEY)
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+
+    def send_batch(self, phones, message):
+        payload = {
+            "source_addr": settings.BEEM_SENDER_ID,
+            "encoding": 0,
+            "message": message,
+            "recipients": [
+                {"recipient_id": i, "dest_addr": phone}
+                for i, phone in enumerate(phones, start=1)
+            ],
+        }
+        try:
+            response = self.session.post(self.url, json=payload, timeout=settings.SMS_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise SMSError(f'Beem unreachable: {e}', retryable=True)
+        if response.status_code >= 400:
+            raise SMSError(
+                f'Beem returned {response.status_code}: {response.text[:200]}',
+                retryable=response.status_code in RETRY_STATUSES,
+            )
+        return response.json()
+
+
+class FakeGateway(BaseGateway):
+    """Keeps (phones, message) pairs in `sent` instead of texting anyone."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send_batch(self, phones, message):
+        self.sent.append((list(phones), message))
+        return {"successful": True, "valid": len(phones), "invalid": 0}
+
+
+@lru_cache(maxsize=None)
+def _load_gateway(path):
+    return import_string(path)()
+
+
+def get_gateway():
+    return _load_gateway(settings.SMS_BACKEND)
+
+
+def send_bulk(phones, message):
+    return get_gateway().send_bulk(phones, message)
+
+
+def send_sms(phone, message):
+    """Text one number. Raises SMSError once retries are used up."""
+    responses = send_bulk([phone], message)
+    return responses[0] if responses else None
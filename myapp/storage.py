@@ -0,0 +1,163 @@
+"""
+Content-addressed, deduplicating storage for MEDIA_ROOT.
+
+Every saved file is stored once under blobs/<aa>/<bb>/<sha256><ext>, whatever
+name the caller asked for, with a StoredBlob row. StoredBlob.refcount is the
+number of model fields that point at the file (MEDIA_FIELDS); signals.py
+keeps it up to date as rows are saved and deleted, and code that writes those
+fields with QuerySet.update() calls retain()/release() itself. delete()
+releases one reference and removes the file when none are left. A blob that
+nothing ever referenced (an upload that never became a report) is swept by
+tasks.collect_orphan_blobs_task.
+
+url() returns signed URLs; see media_access.py.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+
+BLOB_DIR = 'blobs'
+READ_BUFFER_SIZE = 64 * 1024
+
+# model label -> fields holding media names: file fields, or renditions
+# JSON ({rendition: {format: name}})
+MEDIA_FIELDS = {
+    'myapp.Report': ('file', 'file_renditions'),
+    'myapp.ReportHistory': ('file',),
+    'myapp.OpenSpaceBooking': ('file',),
+    'myapp.CustomUser': ('profile_image', 'profile_image_renditions'),
+}
+
+
+def blob_name(digest, extension):
+    return posixpath.join(BLOB_DIR, digest[:2], digest[2:4], digest + extension)
+
+
+def media_names(value):
+    """The stored names in one media field value."""
+    if isinstance(value, dict):
+        return [name for formats in value.values() for name in formats.values() if name]
+    return [str(value)] if value else []
+
+
+def field_names(instance, fields):
+    """{field: Counter of names} for the given fields that are loaded on the instance."""
+    # Deferred fields are skipped: reading them would cost a query, and
+    # save() does not write them either
+    return {
+        field: Counter(media_names(instance.__dict__[field]))
+        for field in fields
+        if field in instance.__dict__
+    }
+
+
+def retain(names):
+    """Add one reference to each name (a Counter or list; repeats count)."""
+    StoredBlob = apps.get_model('myapp', 'StoredBlob')
+    for name, count in Counter(names).items():
+        StoredBlob.objects.filter(name=name).update(refcount=F('refcount') + count)
+
+
+def release(names):
+    """Drop one reference per name, removing files that are no longer used."""
+    for name in Counter(names).elements():
+        default_storage.delete(name)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def url(self, name):
+        from .media_access import sign_url
+        return sign_url(super().url(name), name)
+
+    def get_available_name(self, name, max_length=None):
+        # Names are derived from content in _save(), so collisions are the point
+        return name
+
+    def _spool(self, content):
+        """
+        Hash the content and make sure it sits in a file on the media
+        filesystem. Returns (path, digest, size, owned); `owned` is False when
+        the path is the caller's own temporary file.
+        """
+        os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+        digest = hashlib.sha256()
+
+        if hasattr(content, 'temporary_file_path'):
+            source = content.temporary_file_path()
+            if os.stat(source).st_dev == os.stat(settings.UPLOAD_TEMP_DIR).st_dev:
+                size = 0
+                with open(source, 'rb') as fh:
+                    for chunk in iter(lambda: fh.read(READ_BUFFER_SIZE), b''):
+                        digest.update(chunk)
+                        size += len(chunk)
+                return source, digest.hexdigest(), size, False
+
+        if hasattr(content, 'seek') and content.seekable():
+            content.seek(0)
+        size = 0
+        fd, path = tempfile.mkstemp(dir=settings.UPLOAD_TEMP_DIR, suffix='.blob')
+        with os.fdopen(fd, 'wb') as fh:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                fh.write(chunk)
+                size += len(chunk)
+        return path, digest.hexdigest(), size, True
+
+    def _save(self, name, content):
+        StoredBlob = apps.get_model('myapp', 'StoredBlob')
+
+        extension = os.path.splitext(name)[1].lower()
+        path, digest, size, owned = self._spool(content)
+        name = blob_name(digest, extension)
+        full_path = self.path(name)
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.select_for_update().get_or_create(name=name, defaults={'size': size})
+                if not os.path.exists(full_path):
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    os.replace(path, full_path)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if owned and os.path.exists(path):
+                os.remove(path)
+        return name
+
+    def delete(self, name):
+        """Release one reference to `name`, removing the file once it is unused."""
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        StoredBlob = apps.get_model('myapp', 'StoredBlob')
+
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return  # not a blob this storage tracks; leave it alone
+            if blob.refcount > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            blob.delete()
+            transaction.on_commit(lambda: self._remove_if_unclaimed(name))
+
+    def discard_if_unreferenced(self, name):
+        """Remove a blob nothing refers to; True if it was removed."""
+        StoredBlob = apps.get_model('myapp', 'StoredBlob')
+        with transaction.atomic():
+            if not StoredBlob.objects.select_for_update().filter(name=name, refcount__lte=0).delete()[0]:
+                return False
+            transaction.on_commit(lambda: self._remove_if_unclaimed(name))
+        return True
+
+    def _remove_if_unclaimed(self, name):
+        StoredBlob = apps.get_model('myapp', 'StoredBlob')
+        if not StoredBlob.objects.filter(name=name).exists():
+            super().delete(name)
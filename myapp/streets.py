@@ -0,0 +1,59 @@
+"""
+Linking reports to Street rows.
+
+Reports carry the street as free text. At intake the text is resolved once
+to Report.resolved_street, so a village chairman's inbox is an indexed
+lookup on that foreign key instead of a substring scan over every report.
+
+A street matches when its normalized name appears in the normalized report
+text (the same rule forwarding used to apply in Python). When several
+streets match, one in the report's ward wins, then the longest name.
+Reports that match nothing keep resolved_street empty; the
+link_report_streets command re-runs resolution over existing rows. The
+street list used for matching is cached until a street changes.
+"""
+import re
+
+from . import reference_cache
+from .models import Street
+
+
+def normalize_street(name):
+    """Normalize street name: lowercase, remove parentheses content, trim spaces"""
+    if not name:
+        return ""
+    name = re.sub(r'\(.*?\)', '', name)  # remove text inside parentheses
+    return name.strip().lower()
+
+
+def _build_street_index():
+    index = [
+        (normalize_street(name), ward, pk)
+        for pk, name, ward in Street.objects.values_list('pk', 'name', 'ward__name')
+    ]
+    return sorted((entry for entry in index if entry[0]), key=lambda entry: -len(entry[0]))
+
+
+def street_index():
+    """
+    (normalized name, ward name, street id) for every street, longest name
+    first. Cached with the ward/street lists, so it is rebuilt only after a
+    street changes (see reference_cache.py).
+    """
+    return reference_cache.cached('streets:index', _build_street_index)
+
+
+def resolve_street_id(text, ward=None, index=None):
+    """The id of the Street named in `text`, or None. Pass `index` when resolving many."""
+    text = normalize_street(text)
+    if not text:
+        return None
+    matches = [(name, street_ward, pk) for name, street_ward, pk in index or street_index() if name in text]
+    for name, street_ward, pk in matches:
+        if ward and street_ward == ward:
+            return pk
+    return matches[0][2] if matches else None
+
+
+def resolve_report_street(report, index=None):
+    return resolve_street_id(report.street or report.street_name_backup, report.district, index)
@@ -1,6 +1,15 @@
+from datetime import timedelta
+
 from celery import shared_task
+from django.apps import apps
+from django.core.files.storage import default_storage
 from django.core.mail import send_mail
+from django.db import transaction
 from django.conf import settings
+from django.utils.timezone import now
+from .models import Report, StoredBlob, UploadSession
+from . import images, outbox, rollups, storage, uploads
+from .moderation import get_moderation_backend
 
 @shared_task
 def send_reset_email_task(email, reset_link):
@@ -9,4 +18,143 @@ def send_reset_email_task(email, reset_link):
         message=f'Click the link to reset your password: {reset_link}',
         from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[email]
-    )
\ No newline at end of file
+    )
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=5,
+)
+def send_report_acknowledgement_task(report_pk):
+    """Send the 'Report Received' email for a committed report.
+
+    Queued once the report is approved (by moderate_report_task, or by
+    Report.save() for reports created approved), so rejected reports get no
+    "received" email. Failures are retried with exponential backoff.
+    """
+    try:
+        report = Report.objects.get(pk=report_pk, moderation_status='approved')
+    except Report.DoesNotExist:
+        # Report was deleted (or rejected) before the worker picked the task up
+        return
+
+    if report.email:
+        report._send_notification_email()
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=5,
+)
+def moderate_report_task(report_pk):
+    """Run the text and image checks for a pending report and record the verdict."""
+    try:
+        report = Report.objects.get(pk=report_pk, moderation_status='pending')
+    except Report.DoesNotExist:
+        # Deleted, or already moderated by an earlier delivery of this task
+        return
+
+    backend = get_moderation_backend()
+    reason = None
+    if backend.is_inappropriate_text(report.description):
+        reason = 'Description contains inappropriate language.'
+    elif report.file and backend.is_explicit_image(report.file.name):
+        reason = 'Inappropriate image content detected.'
+
+    decided = Report.objects.filter(pk=report.pk, moderation_status='pending').update(
+        moderation_status='rejected' if reason else 'approved',
+        moderation_reason=reason,
+        updated_at=now(),
+    )
+    if decided and not reason and report.email:
+        report.queue_acknowledgement()
+
+
+@shared_task
+def cleanup_stale_uploads_task():
+    """Abort chunked uploads that stopped receiving data and delete their part files."""
+    cutoff = now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    stale = UploadSession.objects.filter(status='active', updated_at__lt=cutoff).only('pk', 'updated_at')
+    aborted = 0
+    for session in stale:
+        # Conditional on updated_at: a PUT that started since we looked
+        # (reserving a chunk bumps it) keeps its session
+        if UploadSession.objects.filter(
+            pk=session.pk, status='active', updated_at=session.updated_at,
+        ).update(status='aborted', chunk_lease_until=None):
+            uploads.discard(session)
+            aborted += 1
+    return aborted
+
+
+@shared_task(
+    autoretry_for=(OSError,),
+    retry_backoff=True,
+    max_retries=3,
+)
+def generate_image_renditions_task(model_label, pk):
+    """Build thumbnail and display renditions for a Report photo or profile image."""
+    image_field, renditions_field = images.IMAGE_FIELDS[model_label]
+    model = apps.get_model(model_label)
+    try:
+        instance = model.objects.get(pk=pk)
+    except model.DoesNotExist:
+        return
+
+    original = getattr(instance, image_field)
+    renditions = images.render(original.name) if original else {}
+
+    # Only record the result if the image was not replaced while we worked
+    current = model.objects.filter(pk=pk)
+    if original:
+        current = current.filter(**{image_field: original.name})
+    changes = {renditions_field: renditions}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        changes['updated_at'] = now()
+    with transaction.atomic():
+        previous = current.select_for_update().values_list(renditions_field, flat=True).first()
+        if previous is None:
+            return  # nothing refers to these renditions; the orphan sweep removes them
+        current.update(**changes)
+
+        # update() skips the signals that keep media reference counts
+        storage.retain(storage.media_names(renditions))
+        storage.release(storage.media_names(previous))
+
+
+@shared_task
+def collect_orphan_blobs_task():
+    """
+    Check each media blob once, a day after it was stored, and drop it if no
+    row ever started pointing at it (e.g. an upload that never became a report).
+    """
+    cutoff = now() - timedelta(days=1)
+    removed = 0
+    for blob in StoredBlob.objects.filter(checked=False, created_at__lt=cutoff).iterator():
+        if default_storage.discard_if_unreferenced(blob.name):
+            removed += 1
+        else:
+            StoredBlob.objects.filter(pk=blob.pk).update(checked=True)
+    return removed
+
+
+@shared_task
+def drain_outbox_task(channel=None):
+    """Deliver queued SMS/email (see outbox.py). Without a channel, kick one drainer per channel."""
+    if channel is None:
+        for name in outbox.CHANNELS:
+            drain_outbox_task.delay(name)
+        return 0
+    return outbox.drain(channel)
+
+
+@shared_task
+def rollup_statistics_task(days=2):
+    """Refresh the recent per-day statistics counters (see rollups.py)."""
+    return rollups.rollup_recent(days)
@@ -1,3 +1,1637 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import localdate, localtime, now
+from PIL import Image
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from . import models as myapp_models
+from .models import (
+    DailyStat, Notification, OpenSpace, OpenSpaceBooking, OutboundMessage, Report, ReportForward, ReportForwardToadmin, ReportHistory,
+    ReportReply, SpaceOccupancy, StoredBlob, Street,
+    UploadSession, UssdReport, Ward,
+)
+from . import conditional, geo, media_access, outbox, reservations, rollups, search, sms_gateway, streets, uploads
+from .notification_task import check_expired_bookings_task
+from .pagination import BookingCursorPagination
+from .report_ids import ALPHABET, REPORT_ID_LENGTH, generate_report_id
+from .schema import schema
+from .serializers import ReportSerializer
+from .views import UserBooking
+from .moderation import LocalModerationBackend, get_moderation_backend
+from .tasks import (
+    cleanup_stale_uploads_task,
+    collect_orphan_blobs_task,
+    drain_outbox_task,
+    generate_image_renditions_task,
+    moderate_report_task,
+    send_report_acknowledgement_task,
+)
+
+
+class ReportIdTests(TestCase):
+    def test_ids_are_unique_and_time_ordered(self):
+        ids = [generate_report_id() for _ in range(5000)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+        for report_id in ids[:10]:
+            self.assertEqual(len(report_id), REPORT_ID_LENGTH)
+            self.assertTrue(set(report_id) <= set(ALPHABET))
+
+    def test_save_allocates_without_exists_query(self):
+        with self.assertNumQueries(3):  # savepoint, insert, release
+            report = Report.objects.create(description='Broken bench')
+        self.assertEqual(len(report.report_id), REPORT_ID_LENGTH)
+
+    def test_save_retries_on_report_id_collision(self):
+        existing = Report.objects.create(description='First')
+        fresh_id = generate_report_id()
+        with mock.patch.object(
+            myapp_models, 'generate_report_id', side_effect=[existing.report_id, fresh_id]
+        ):
+            report = Report.objects.create(description='Second')
+        self.assertEqual(report.report_id, fresh_id)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        error = IntegrityError('NOT NULL constraint failed: myapp_report.description')
+        with mock.patch('django.db.models.Model.save', side_effect=error) as save:
+            with self.assertRaises(IntegrityError):
+                Report.objects.create(description='Broken bench')
+        save.assert_called_once()
+
+    def test_save_gives_up_after_max_attempts(self):
+        existing = Report.objects.create(description='First')
+        with mock.patch.object(myapp_models, 'generate_report_id', return_value=existing.report_id):
+            with self.assertRaises(IntegrityError):
+                Report.objects.create(description='Second')
+
+
+@mock.patch.object(moderate_report_task, 'delay')
+class ReportAcknowledgementTests(TestCase):
+    def test_save_queues_acknowledgement_after_commit(self, moderate_delay):
+        with mock.patch.object(send_report_acknowledgement_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                report = Report.objects.create(
+                    description='Illegal dumping', email='citizen@example.com', moderation_status='approved',
+                )
+            delay.assert_not_called()
+            self.assertEqual(len(mail.outbox), 0)
+
+            for callback in callbacks:
+                callback()
+        delay.assert_called_once_with(report.pk)
+
+    def test_save_without_email_queues_no_acknowledgement(self, moderate_delay):
+        with mock.patch.object(send_report_acknowledgement_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                Report.objects.create(description='Illegal dumping')
+        delay.assert_not_called()
+
+    def test_pending_report_is_acknowledged_only_once_approved(self, moderate_delay):
+        with mock.patch.object(send_report_acknowledgement_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                approved = Report.objects.create(description='Illegal dumping', email='citizen@example.com')
+                rejected = Report.objects.create(description='this is shit', email='troll@example.com')
+            delay.assert_not_called()
+            backend = mock.Mock(is_inappropriate_text=lambda text: 'shit' in text)
+            with mock.patch('myapp.tasks.get_moderation_backend', return_value=backend):
+                with self.captureOnCommitCallbacks(execute=True):
+                    moderate_report_task.run(approved.pk)
+                    moderate_report_task.run(rejected.pk)
+        delay.assert_called_once_with(approved.pk)
+
+    def test_task_sends_acknowledgement(self, moderate_delay):
+        with mock.patch.object(send_report_acknowledgement_task, 'delay'):
+            report = Report.objects.create(
+                description='Illegal dumping', email='citizen@example.com', moderation_status='approved',
+            )
+        send_report_acknowledgement_task.run(report.pk)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(report.report_id, mail.outbox[0].subject)
+
+    def test_task_skips_rejected_report(self, moderate_delay):
+        report = Report.objects.create(
+            description='Illegal dumping', email='citizen@example.com', moderation_status='rejected',
+        )
+        send_report_acknowledgement_task.run(report.pk)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_task_ignores_deleted_report(self, moderate_delay):
+        send_report_acknowledgement_task.run(999999)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'moderation': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'moderation-tests',
+        'OPTIONS': {'MAX_ENTRIES': 100},
+    },
+}
+
+
+class ReportModerationTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            MODERATION_BACKEND='myapp.moderation.LocalModerationBackend',
+            CACHES=LOCMEM_CACHES,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        get_moderation_backend.cache_clear()
+        self.addCleanup(get_moderation_backend.cache_clear)
+        caches['moderation'].clear()
+
+    @mock.patch.object(generate_image_renditions_task, 'delay')
+    def _report(self, renditions_delay, description='Overflowing bins near the market', color=None):
+        with mock.patch.object(moderate_report_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                report = Report(description=description)
+                if color:
+                    buffer = ContentFile(b'')
+                    Image.new('RGB', (32, 32), color).save(buffer, format='PNG')
+                    report.file.save('photo.png', buffer, save=False)
+                report.save()
+        delay.assert_called_once_with(report.pk)
+        self.assertEqual(report.moderation_status, 'pending')
+        return report
+
+    def test_clean_report_is_approved(self):
+        report = self._report(color=(20, 60, 200))
+        moderate_report_task.run(report.pk)
+        report.refresh_from_db()
+        self.assertEqual(report.moderation_status, 'approved')
+        self.assertIsNone(report.moderation_reason)
+
+    def test_profane_description_is_rejected(self):
+        report = self._report(description='this is shit')
+        moderate_report_task.run(report.pk)
+        report.refresh_from_db()
+        self.assertEqual(report.moderation_status, 'rejected')
+        self.assertIn('language', report.moderation_reason)
+
+    def test_explicit_image_is_rejected(self):
+        report = self._report(color=(224, 172, 140))
+        moderate_report_task.run(report.pk)
+        report.refresh_from_db()
+        self.assertEqual(report.moderation_status, 'rejected')
+        self.assertIn('image', report.moderation_reason)
+
+    def test_unreadable_image_is_retried_not_approved(self):
+        report = self._report(color=(20, 60, 200))
+        os.remove(os.path.join(self.media_root, report.file.name))
+        with self.assertRaises(FileNotFoundError):
+            moderate_report_task.run(report.pk)
+        report.refresh_from_db()
+        self.assertEqual(report.moderation_status, 'pending')
+
+    def test_task_is_idempotent(self):
+        report = self._report()
+        Report.objects.filter(pk=report.pk).update(moderation_status='rejected')
+        moderate_report_task.run(report.pk)
+        report.refresh_from_db()
+        self.assertEqual(report.moderation_status, 'rejected')
+
+    def test_duplicate_image_verdict_is_served_from_cache(self):
+        first = self._report(color=(20, 60, 200))
+        second = self._report(color=(20, 60, 200))
+        with mock.patch.object(
+            LocalModerationBackend, 'is_explicit_image', autospec=True, return_value=False
+        ) as classify:
+            moderate_report_task.run(first.pk)
+            moderate_report_task.run(second.pk)
+        self.assertEqual(classify.call_count, 1)
+        second.refresh_from_db()
+        self.assertEqual(second.moderation_status, 'approved')
+
+    def test_text_verdict_cache_ignores_case_and_whitespace(self):
+        backend = get_moderation_backend()
+        with mock.patch.object(
+            LocalModerationBackend, 'is_inappropriate_text', autospec=True, return_value=False
+        ) as classify:
+            backend.is_inappropriate_text('Dumping near  Mwenge')
+            backend.is_inappropriate_text('  dumping NEAR mwenge ')
+        self.assertEqual(classify.call_count, 1)
+
+
+def png_bytes(size=(64, 64), color=(20, 60, 200)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            UPLOAD_TEMP_DIR=os.path.join(self.media_root, '.uploads'),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = APIClient()
+
+    def _start(self, data):
+        response = self.client.post(
+            reverse('chunked-upload'), {'filename': 'my photo.jpeg', 'size': len(data)}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return reverse('chunked-upload-detail', args=[response.data['upload_id']])
+
+    def _put(self, url, data, start, total):
+        return self.client.generic(
+            'PUT', url, data,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(data) - 1}/{total}',
+        )
+
+    def test_upload_in_chunks_and_resume(self):
+        data = png_bytes()
+        url = self._start(data)
+        half = len(data) // 2
+
+        response = self._put(url, data[:half], 0, len(data))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['offset'], half)
+
+        # Replaying a chunk the server already has is refused with the resume offset
+        response = self._put(url, data[:half], 0, len(data))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(url).data['offset'], half)
+
+        response = self._put(url, data[half:], half, len(data))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'complete')
+
+        # Stored under the sniffed extension, not the client-supplied one
+        file_path = response.data['file_path']
+        self.assertTrue(file_path.endswith('.png'))
+        with open(os.path.join(self.media_root, file_path), 'rb') as fh:
+            self.assertEqual(fh.read(), data)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, '.uploads')), [])
+
+    def test_first_chunk_with_unknown_magic_bytes_is_rejected(self):
+        data = b'MZ\x90\x00 not really a picture'
+        url = self._start(data)
+        response = self._put(url, data, 0, len(data))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().received_size, 0)
+
+    def test_first_chunk_shorter_than_the_magic_bytes(self):
+        data = png_bytes()
+        url = self._start(data)
+        self.assertEqual(self._put(url, data[:3], 0, len(data)).status_code, 200)
+        self.assertEqual(self._put(url, data[3:20], 3, len(data)).status_code, 200)
+        self.assertEqual(self._put(url, data[20:], 20, len(data)).status_code, 201)
+
+        data = b'MZ\x90\x00 not really a picture'
+        url = self._start(data)
+        self.assertEqual(self._put(url, data[:3], 0, len(data)).status_code, 200)
+        self.assertEqual(self._put(url, data[3:], 3, len(data)).status_code, 400)
+
+    def test_chunk_being_sent_by_another_request_is_a_conflict(self):
+        data = png_bytes()
+        url = self._start(data)
+        session = UploadSession.objects.get()
+        session.chunk_lease_until = now() + timedelta(minutes=5)
+        session.save()
+        self.assertEqual(self._put(url, data, 0, len(data)).status_code, 409)
+
+        # A lease that ran out (client vanished mid-chunk) is taken over
+        UploadSession.objects.update(chunk_lease_until=now() - timedelta(seconds=1))
+        self.assertEqual(self._put(url, data, 0, len(data)).status_code, 201)
+        self.assertIsNone(UploadSession.objects.get().chunk_lease_until)
+
+    def test_losing_the_lease_keeps_a_reports_identical_file(self):
+        data = png_bytes()
+        name = default_storage.save('reports/a.png', ContentFile(data))
+        with mock.patch.object(generate_image_renditions_task, 'delay'):
+            Report.objects.create(description='Dumping', file=name, moderation_status='approved')
+        url = self._start(data)
+        assemble = uploads.assemble
+
+        def assemble_and_lose_the_lease(session, *args, **kwargs):
+            # Meanwhile the lease runs out and another request takes the chunk over
+            UploadSession.objects.update(chunk_lease_until=now() + timedelta(minutes=5))
+            return assemble(session, *args, **kwargs)
+
+        with mock.patch('myapp.views.uploads.assemble', side_effect=assemble_and_lose_the_lease):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self._put(url, data, 0, len(data)).status_code, 409)
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_cleanup_leaves_sessions_that_became_busy(self):
+        data = png_bytes()
+        self._start(data)
+        self._start(data)
+        UploadSession.objects.update(updated_at=now() - timedelta(days=2))
+        discarded = []
+
+        def discard(session):
+            discarded.append(session.pk)
+            # Meanwhile a PUT reserves a chunk on the other session
+            UploadSession.objects.exclude(pk__in=discarded).update(updated_at=now())
+
+        with mock.patch('myapp.tasks.uploads.discard', side_effect=discard):
+            self.assertEqual(cleanup_stale_uploads_task.run(), 1)
+        self.assertEqual(
+            sorted(UploadSession.objects.values_list('status', flat=True)), ['aborted', 'active'],
+        )
+
+    def test_chunk_must_match_content_range(self):
+        data = png_bytes()
+        url = self._start(data)
+        response = self.client.generic(
+            'PUT', url, data[:10], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 0-19/{len(data)}',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_other_users_cannot_touch_a_session(self):
+        owner = get_user_model().objects.create_user('owner', password='x' * 10)
+        self.client.force_authenticate(owner)
+        url = self._start(png_bytes())
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_simple_upload_sniffs_content(self):
+        response = self.client.post(
+            reverse('file-upload'),
+            {'file': SimpleUploadedFile('notes.jpg', b'plain text pretending to be a jpeg')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            reverse('file-upload'),
+            {'file': SimpleUploadedFile('photo.png', png_bytes())},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class ImageRenditionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def _report_with_photo(self, size=(3000, 2000)):
+        report = Report(description='Flooded playground', moderation_status='approved')
+        report.file.save('photo.png', ContentFile(png_bytes(size)), save=False)
+        with mock.patch.object(generate_image_renditions_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                report.save()
+        delay.assert_called_once_with('myapp.Report', report.pk)
+        return report
+
+    def test_renditions_are_written_next_to_the_original(self):
+        report = self._report_with_photo()
+        generate_image_renditions_task.run('myapp.Report', report.pk)
+        report.refresh_from_db()
+
+        self.assertEqual(set(report.file_renditions), {'thumb', 'display'})
+        thumb = report.file_renditions['thumb']['webp']
+        self.assertTrue(thumb.endswith('.webp'))
+        with Image.open(os.path.join(self.media_root, thumb)) as image:
+            self.assertEqual(image.size, (320, 213))
+        with Image.open(os.path.join(self.media_root, report.file_renditions['display']['jpeg'])) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (1280, 853))
+
+        data = ReportSerializer(report).data
+        self.assertTrue(data['file_renditions']['thumb']['webp'].startswith(f'/media/{thumb}?e='))
+
+    def test_renditions_are_reference_counted(self):
+        report = self._report_with_photo(size=(400, 300))
+        generate_image_renditions_task.run('myapp.Report', report.pk)
+        generate_image_renditions_task.run('myapp.Report', report.pk)
+        report.refresh_from_db()
+        names = [name for formats in report.file_renditions.values() for name in formats.values()]
+        self.assertEqual(set(StoredBlob.objects.filter(name__in=names).values_list('refcount', flat=True)), {1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    def test_small_images_are_not_upscaled(self):
+        report = self._report_with_photo(size=(100, 80))
+        generate_image_renditions_task.run('myapp.Report', report.pk)
+        report.refresh_from_db()
+        with Image.open(os.path.join(self.media_root, report.file_renditions['display']['webp'])) as image:
+            self.assertEqual(image.size, (100, 80))
+
+    def test_pdf_attachments_get_no_renditions(self):
+        report = Report(description='Scanned letter', moderation_status='approved')
+        report.file.save('letter.pdf', ContentFile(b'%PDF-1.4 not an image'), save=False)
+        with mock.patch.object(generate_image_renditions_task, 'delay'):
+            report.save()
+        generate_image_renditions_task.run('myapp.Report', report.pk)
+        report.refresh_from_db()
+        self.assertEqual(report.file_renditions, {})
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            UPLOAD_TEMP_DIR=os.path.join(self.media_root, '.uploads'),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def _report(self, name):
+        with mock.patch.object(generate_image_renditions_task, 'delay'):
+            return Report.objects.create(description='Dumping', file=name, moderation_status='approved')
+
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('reports/a.png', ContentFile(png_bytes()))
+        second = default_storage.save('reports/b.png', ContentFile(png_bytes()))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/'))
+        # Saving alone is not a reference; the rows that point at it are
+        self.assertEqual(StoredBlob.objects.get(name=first).refcount, 0)
+        self._report(first), self._report(first)
+        self.assertEqual(StoredBlob.objects.get(name=first).refcount, 2)
+
+    def test_delete_does_not_scan_for_references(self):
+        name = default_storage.save('reports/a.png', ContentFile(png_bytes()))
+        report = self._report(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                Report.objects.filter(pk=report.pk).delete()
+        blob_queries = [query['sql'] for query in queries if 'myapp_storedblob' in query['sql']]
+        self.assertEqual(len(blob_queries), 2)  # lock the blob row, delete it
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_replacing_a_file_moves_the_reference(self):
+        first = default_storage.save('reports/a.png', ContentFile(png_bytes()))
+        second = default_storage.save('reports/b.pdf', ContentFile(b'%PDF-1.4 second'))
+        report = self._report(first)
+        report.file = second
+        with self.captureOnCommitCallbacks(execute=True):
+            report.save()
+        self.assertFalse(default_storage.exists(first))
+        self.assertEqual(StoredBlob.objects.get(name=second).refcount, 1)
+
+    def test_blob_is_collected_with_its_last_report(self):
+        name = default_storage.save('reports/a.png', ContentFile(png_bytes()))
+        default_storage.save('reports/b.png', ContentFile(png_bytes()))
+        first, second = self._report(name), self._report(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+
+    def test_booking_delete_releases_its_file(self):
+        name = default_storage.save('bookings/files/permit.pdf', ContentFile(b'%PDF-1.4 permit'))
+        ward = Ward.objects.create(name='Mwenge')
+        space = OpenSpace.objects.create(name='Mwenge Grounds', latitude=-6.77, longitude=39.22, district=ward)
+        booking = OpenSpaceBooking.objects.create(
+            space=space, username='asha', contact='255700000000', startdate=date.today(),
+            purpose='Wedding', file=name,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_history_keeps_a_confirmed_reports_file(self):
+        name = default_storage.save('reports/a.png', ContentFile(png_bytes()))
+        report = self._report(name)
+        ReportHistory.objects.create(report_id=report.report_id, description=report.description, file=report.file)
+        with self.captureOnCommitCallbacks(execute=True):
+            report.delete()
+        self.assertTrue(default_storage.exists(name))
+
+    def test_unattached_uploads_are_swept(self):
+        orphan = default_storage.save('reports/a.png', ContentFile(png_bytes()))
+        kept = default_storage.save('reports/b.pdf', ContentFile(b'%PDF-1.4 kept'))
+        self._report(kept)
+        StoredBlob.objects.update(created_at=now() - timedelta(days=2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(collect_orphan_blobs_task.run(), 1)
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(kept))
+        self.assertTrue(StoredBlob.objects.get(name=kept).checked)
+
+
+class MediaAccessTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL_REDIRECT=False)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        User = get_user_model()
+        self.reporter = User.objects.create_user(username='reporter', password='pass12345')
+        self.stranger = User.objects.create_user(username='stranger', password='pass12345')
+        self.name = default_storage.save('reports/a.png', ContentFile(png_bytes()))
+        with mock.patch.object(generate_image_renditions_task, 'delay'):
+            Report.objects.create(
+                description='Dumping', file=self.name, user=self.reporter, moderation_status='approved',
+            )
+        self.client = APIClient()
+
+    def test_signed_url_is_served(self):
+        response = self.client.get(default_storage.url(self.name))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(response.streaming_content), png_bytes())
+
+    def test_tampered_or_expired_signature_is_rejected(self):
+        url = default_storage.url(self.name)
+        self.assertEqual(self.client.get(url[:-1] + ('A' if url[-1] != 'A' else 'B')).status_code, 404)
+        path = url.split('?')[0]
+        signature = url.split('&s=')[1]
+        self.assertEqual(self.client.get(f'{path}?e=1&s={signature}').status_code, 404)
+
+    def test_unsigned_requests_are_authorized_per_file(self):
+        path = f'/media/{self.name}'
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(path).status_code, 404)
+        self.client.force_login(self.reporter)
+        self.assertEqual(self.client.get(path).status_code, 200)
+
+    def test_in_progress_uploads_are_never_served(self):
+        self.client.force_login(self.reporter)
+        self.assertEqual(self.client.get('/media/.uploads/x.part').status_code, 404)
+        self.assertEqual(self.client.get('/media/reports/../../settings.py').status_code, 404)
+
+    def test_graphql_reports_sign_files_only_for_allowed_viewers(self):
+        def files_seen_by(user):
+            result = schema.execute('{ allReports { file } }', context_value=mock.Mock(user=user))
+            self.assertIsNone(result.errors)
+            return [report['file'] for report in result.data['allReports']]
+
+        self.assertEqual(files_seen_by(AnonymousUser()), [None])
+        self.assertEqual(files_seen_by(self.stranger), [None])
+        url, = files_seen_by(self.reporter)
+        self.assertTrue(url.startswith(f'/media/{self.name}?e='))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT=True)
+    def test_transfer_is_handed_to_nginx(self):
+        response = self.client.get(default_storage.url(self.name))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+
+
+class BookingPaginationTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='admin', password='pass12345', role='staff')
+        ward = Ward.objects.create(name='Mwenge')
+        space = OpenSpace.objects.create(name='Mwenge Grounds', latitude=-6.77, longitude=39.22, district=ward)
+        self.bookings = [
+            OpenSpaceBooking.objects.create(
+                space=space, user=self.staff, username='asha', contact='255700000000',
+                startdate=date.today(), purpose=f'Event {i}',
+            )
+            for i in range(5)
+        ]
+        # Several bookings sharing a timestamp must still page deterministically
+        OpenSpaceBooking.objects.filter(pk__in=[b.pk for b in self.bookings[1:4]]).update(
+            created_at=self.bookings[1].created_at,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def _walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_admin_list_pages_newest_first_without_gaps(self):
+        ids = self._walk(reverse('all_booking') + '?page_size=2')
+        expected = list(
+            OpenSpaceBooking.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_my_bookings_are_paginated(self):
+        ids = self._walk(reverse('user_bookings') + '?page_size=2')
+        self.assertEqual(sorted(ids), sorted(b.pk for b in self.bookings))
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(BookingCursorPagination, 'max_page_size', 3):
+            response = self.client.get(reverse('all_booking') + '?page_size=100000')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+
+class BookingListQueryBudgetTests(TestCase):
+    """Every booking list runs a fixed number of queries, whatever the page size."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.ward = Ward.objects.create(name='Mwenge')
+        self.staff = User.objects.create_user(username='admin', password='pass12345', role='staff')
+        self.executive = User.objects.create_user(
+            username='exec', password='pass12345', role='ward_executive', ward=self.ward,
+        )
+        self.client = APIClient()
+
+    def _add_bookings(self, count):
+        for i in range(count):
+            space = OpenSpace.objects.create(
+                name=f'Space {i}', latitude=-6.77, longitude=39.22, district=self.ward,
+            )
+            OpenSpaceBooking.objects.create(
+                space=space, user=self.staff, username='asha', contact='255700000000',
+                startdate=date.today(), purpose='Wedding', district=str(self.ward),
+            )
+
+    def _get(self, user, url, view):
+        if view is None:
+            self.client.force_authenticate(user)
+            return self.client.get(url)
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user)
+        return view(request)
+
+    def assertQueryBudget(self, user, url, budget, view=None):
+        self._add_bookings(1)
+        with self.assertNumQueries(budget):
+            self.assertEqual(len(self._get(user, url, view).data['results']), 1)
+        self._add_bookings(20)
+        with self.assertNumQueries(budget):
+            self.assertEqual(len(self._get(user, url, view).data['results']), 21)
+
+    # One query for the page, plus one ETag aggregate per source table
+    def test_admin_bookings(self):
+        self.assertQueryBudget(self.staff, reverse('all_booking'), 2)
+
+    def test_my_bookings(self):
+        self.assertQueryBudget(self.staff, reverse('user_bookings'), 2)
+
+    def test_district_bookings(self):
+        self.assertQueryBudget(self.executive, reverse('district-bookings'), 3)
+
+    def test_user_booking(self):
+        # Not routed in urls.py, so the view is called directly; it sends no ETag
+        self.assertQueryBudget(self.staff, '/user-booking/', 1, view=UserBooking.as_view())
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='asha', password='pass12345')
+        self.ward = Ward.objects.create(name='Mwenge')
+        self.space = OpenSpace.objects.create(name='Mwenge Grounds', latitude=-6.77, longitude=39.22, district=self.ward)
+        self.other = OpenSpace.objects.create(name='Sinza Park', latitude=-6.78, longitude=39.23, district=self.ward)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = date.today() + timedelta(days=10)
+
+    def _book(self, space, first, last=None):
+        data = {
+            'space_id': space.pk, 'username': 'asha', 'contact': '255700000000',
+            'startdate': self.start + timedelta(days=first), 'purpose': 'Wedding',
+        }
+        if last is not None:
+            data['enddate'] = self.start + timedelta(days=last)
+        return self.client.post(reverse('book-open-space'), data, format='json')
+
+    def test_overlapping_dates_are_refused(self):
+        self.assertEqual(self._book(self.space, 0, 2).status_code, 201)
+        self.assertEqual(self._book(self.space, 2, 4).status_code, 400)
+        self.assertEqual(self._book(self.space, 1).status_code, 400)
+        self.assertEqual(self._book(self.space, 3, 4).status_code, 201)
+        self.assertEqual(self._book(self.other, 0, 2).status_code, 201)
+        self.space.refresh_from_db()
+        self.assertEqual(self.space.status, 'unavailable')
+
+    def test_end_before_start_is_refused(self):
+        self.assertEqual(self._book(self.space, 2, 0).status_code, 400)
+
+    def test_booking_length_is_capped(self):
+        longest = reservations.MAX_BOOKING_DAYS - 1
+        response = self._book(self.space, 0, longest + 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('enddate', response.data)
+        self.assertFalse(OpenSpaceBooking.objects.exists())
+        self.assertEqual(self._book(self.space, 0, longest).status_code, 201)
+        self.assertEqual(SpaceOccupancy.objects.count(), reservations.MAX_BOOKING_DAYS)
+
+    def test_accepting_a_stale_copy_sees_the_rejection(self):
+        first = self._book(self.space, 0, 2).data['id']
+        stale = OpenSpaceBooking.objects.get(pk=first)
+        # A reject commits between loading the booking and accepting it
+        reservations.set_status(OpenSpaceBooking.objects.get(pk=first), 'rejected')
+        self.assertEqual(self._book(self.space, 1, 3).status_code, 201)
+
+        with self.assertRaises(reservations.BookingConflict):
+            reservations.set_status(stale, 'accepted')
+        self.assertEqual(OpenSpaceBooking.objects.get(pk=first).status, 'rejected')
+        self.assertFalse(SpaceOccupancy.objects.filter(booking_id=first).exists())
+
+        # With the dates still free, the accept takes them back
+        second = self._book(self.other, 0, 2).data['id']
+        stale = OpenSpaceBooking.objects.get(pk=second)
+        reservations.set_status(OpenSpaceBooking.objects.get(pk=second), 'rejected')
+        reservations.set_status(stale, 'accepted')
+        self.assertEqual(SpaceOccupancy.objects.filter(booking_id=second).count(), 3)
+        self.assertEqual(self._book(self.other, 1).status_code, 400)
+
+    def test_rejecting_frees_the_dates(self):
+        first = self._book(self.space, 0, 2).data['id']
+        self.client.post(reverse('reject-booking', args=[first]))
+        self.space.refresh_from_db()
+        self.assertEqual(self.space.status, 'available')
+        self.assertEqual(self._book(self.space, 1, 3).status_code, 201)
+
+        # The rejected booking cannot be accepted over the new one
+        response = self.client.post(reverse('accept-booking', args=[first]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(OpenSpaceBooking.objects.get(pk=first).status, 'rejected')
+
+    def test_availability_for_a_date_range(self):
+        self._book(self.space, 0, 2)
+        url = reverse('openspace-availability')
+
+        response = self.client.get(url, {'start': self.start + timedelta(days=2), 'ward': self.ward.pk})
+        self.assertEqual(
+            {space['name']: space['available'] for space in response.data['spaces']},
+            {'Mwenge Grounds': False, 'Sinza Park': True},
+        )
+        response = self.client.get(url, {'start': self.start + timedelta(days=3), 'end': self.start + timedelta(days=9)})
+        self.assertTrue(all(space['available'] for space in response.data['spaces']))
+        self.assertEqual(self.client.get(url, {'start': 'soon'}).status_code, 400)
+
+    def test_calendar_lists_booked_days_per_space(self):
+        first = self._book(self.space, 0, 2).data['id']
+        self._book(self.other, 5)
+        url = reverse('openspace-calendar')
+        params = {'start': self.start + timedelta(days=1), 'end': self.start + timedelta(days=6), 'ward': self.ward.pk}
+
+        with self.assertNumQueries(2):
+            spaces = {space['name']: space for space in self.client.get(url, params).data['spaces']}
+        self.assertEqual(
+            spaces['Mwenge Grounds']['booked_days'],
+            [self.start + timedelta(days=1), self.start + timedelta(days=2)],
+        )
+        self.assertEqual(spaces['Sinza Park']['booked_days'], [self.start + timedelta(days=5)])
+        self.assertFalse(spaces['Sinza Park']['available'])
+
+        # Rejected and deleted bookings drop out of the index
+        self.client.post(reverse('reject-booking', args=[first]))
+        spaces = {space['name']: space for space in self.client.get(url, params).data['spaces']}
+        self.assertEqual(spaces['Mwenge Grounds']['booked_days'], [])
+        self.assertEqual(self.client.get(url, {'start': self.start, 'end': self.start + timedelta(days=400)}).status_code, 400)
+
+    def test_the_index_refuses_double_bookings(self):
+        booking = OpenSpaceBooking.objects.get(pk=self._book(self.space, 0).data['id'])
+        with self.assertRaises(IntegrityError):
+            SpaceOccupancy.objects.create(space=self.space, day=self.start, booking=booking)
+
+
+class ExpiredBookingSweepTests(TestCase):
+    def setUp(self):
+        ward = Ward.objects.create(name='Mwenge')
+        self.spaces = [
+            OpenSpace.objects.create(name=f'Space {i}', latitude=-6.77, longitude=39.22, district=ward)
+            for i in range(3)
+        ]
+        self.today = date.today()
+
+    def _accepted(self, space, first, last):
+        booking = reservations.reserve(
+            space.pk, username='asha', contact='255700000000', purpose='Wedding',
+            startdate=self.today + timedelta(days=first), enddate=self.today + timedelta(days=last),
+        )
+        return reservations.set_status(booking, 'accepted')
+
+    def test_sweep_completes_ended_bookings_in_constant_queries(self):
+        ended = [self._accepted(space, -5, -1) for space in self.spaces]
+        ongoing = self._accepted(self.spaces[0], 0, 2)
+        OpenSpace.objects.update(status='unavailable')
+
+        with self.assertNumQueries(7):
+            self.assertEqual(check_expired_bookings_task.run(), 3)
+
+        self.assertEqual(
+            set(OpenSpaceBooking.objects.filter(status='completed').values_list('pk', flat=True)),
+            {b.pk for b in ended},
+        )
+        self.assertEqual(OpenSpaceBooking.objects.get(pk=ongoing.pk).status, 'accepted')
+        statuses = dict(OpenSpace.objects.values_list('name', 'status'))
+        self.assertEqual(statuses, {'Space 0': 'unavailable', 'Space 1': 'available', 'Space 2': 'available'})
+        self.assertEqual(OutboundMessage.objects.filter(channel='sms').count(), 3)
+
+        # Idempotent: the next night has nothing to do
+        self.assertEqual(check_expired_bookings_task.run(), 0)
+        self.assertEqual(OutboundMessage.objects.count(), 3)
+
+
+@override_settings(SMS_BACKEND='myapp.sms_gateway.FakeGateway', SMS_BATCH_SIZE=2)
+class SMSGatewayTests(TestCase):
+    def setUp(self):
+        self.gateway = sms_gateway.get_gateway()
+        self.gateway.sent.clear()
+
+    def test_recipients_are_batched_and_deduplicated(self):
+        sms_gateway.send_bulk(['2551', '2552', '2551', '', '2553', '2554', '2555'], 'Water cut tomorrow')
+        self.assertEqual(
+            [phones for phones, _ in self.gateway.sent],
+            [['2551', '2552'], ['2553', '2554'], ['2555']],
+        )
+
+    def test_token_bucket_paces_bursts(self):
+        clock = [0.0]
+        sleeps = []
+        bucket = sms_gateway.TokenBucket(2, clock=lambda: clock[0], sleep=sleeps.append)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(sleeps, [])
+        bucket.acquire()
+        self.assertEqual(sleeps, [0.5])
+        clock[0] = 10
+        bucket.acquire()
+        self.assertEqual(sleeps, [0.5])
+
+    def test_beem_requires_a_real_sender_id(self):
+        for sender in ('', 'YOUR_SENDER_ID'):
+            with self.subTest(sender=sender), override_settings(BEEM_SENDER_ID=sender):
+                with self.assertRaises(ImproperlyConfigured):
+                    sms_gateway.BeemGateway()
+
+    def test_production_startup_checks_the_gateway(self):
+        sms_gateway._load_gateway.cache_clear()
+        self.addCleanup(sms_gateway._load_gateway.cache_clear)
+        with override_settings(
+            ENVIRONMENT='production',
+            SMS_BACKEND='myapp.sms_gateway.BeemGateway',
+            BEEM_SENDER_ID='YOUR_SENDER_ID',
+        ):
+            with self.assertRaises(ImproperlyConfigured):
+                django_apps.get_app_config('myapp').ready()
+
+    @override_settings(BEEM_SENDER_ID='OPENSPACE')
+    @mock.patch('myapp.sms_gateway.time.sleep')
+    def test_beem_retries_transient_failures(self, sleep):
+        gateway = sms_gateway.BeemGateway()
+        busy = mock.Mock(status_code=503, text='busy')
+        ok = mock.Mock(status_code=200, json=lambda: {'successful': True})
+        with mock.patch.object(gateway.session, 'post', side_effect=[busy, ok]) as post:
+            self.assertEqual(gateway.send_bulk(['2551'], 'hi'), [{'successful': True}])
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(post.call_args.kwargs['json']['recipients'], [{'recipient_id': 1, 'dest_addr': '2551'}])
+        self.assertEqual(post.call_args.kwargs['json']['source_addr'], 'OPENSPACE')
+        sleep.assert_called_once()
+
+        bad_request = mock.Mock(status_code=400, text='invalid sender')
+        with mock.patch.object(gateway.session, 'post', return_value=bad_request) as post:
+            with self.assertRaises(sms_gateway.SMSError):
+                gateway.send_bulk(['2551'], 'hi')
+        self.assertEqual(post.call_count, 1)
+
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    SMS_BACKEND='myapp.sms_gateway.FakeGateway',
+    OUTBOX_MAX_ATTEMPTS=2,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.gateway = sms_gateway.get_gateway()
+        self.gateway.sent.clear()
+
+    def test_booking_decision_is_queued_then_delivered(self):
+        ward = Ward.objects.create(name='Mwenge')
+        space = OpenSpace.objects.create(name='Mwenge Grounds', latitude=-6.77, longitude=39.22, district=ward)
+        booking = reservations.reserve(
+            space.pk, username='asha', contact='255700000000', purpose='Wedding', startdate=date.today(),
+        )
+        with mock.patch.object(drain_outbox_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                APIClient().post(reverse('accept-booking', args=[booking.pk]))
+        delay.assert_called_once_with('sms')
+        self.assertEqual(self.gateway.sent, [])
+
+        self.assertEqual(drain_outbox_task.run('sms'), 1)
+        self.assertEqual(self.gateway.sent[0][0], ['255700000000'])
+        self.assertIn('ACCEPTED', self.gateway.sent[0][1])
+        self.assertEqual(OutboundMessage.objects.get().status, 'sent')
+
+    def test_identical_sms_share_a_gateway_request(self):
+        outbox.enqueue_sms_many([('2551', 'Water cut'), ('2552', 'Water cut'), ('2553', 'Road closed')])
+        outbox.drain('sms')
+        self.assertEqual(sorted(self.gateway.sent), [(['2551', '2552'], 'Water cut'), (['2553'], 'Road closed')])
+
+    def test_emails_go_over_one_connection(self):
+        for n in range(3):
+            outbox.enqueue_email(f'user{n}@example.com', 'Hello', 'Body')
+        with mock.patch('myapp.outbox.get_connection', wraps=outbox.get_connection) as get_connection:
+            self.assertEqual(outbox.drain('email'), 3)
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failures_are_retried_then_dead_lettered(self):
+        message = outbox.enqueue_sms('2551', 'hi')
+        with mock.patch('myapp.outbox.sms_gateway.send_bulk', side_effect=sms_gateway.SMSError('down')):
+            outbox.drain('sms')
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts, message.last_error), ('pending', 1, 'down'))
+            self.assertGreater(message.next_attempt_at, now())
+
+            # Not due yet
+            self.assertEqual(outbox.drain('sms'), 0)
+            OutboundMessage.objects.update(next_attempt_at=now())
+            outbox.drain('sms')
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('dead', 2))
+
+    def test_abandoned_claims_are_picked_up_again(self):
+        outbox.enqueue_sms('2551', 'hi')
+        self.assertEqual(len(outbox.claim('sms', 10)), 1)
+        self.assertEqual(outbox.claim('sms', 10), [])
+        OutboundMessage.objects.update(next_attempt_at=now() - timedelta(seconds=1))
+        self.assertEqual(len(outbox.claim('sms', 10)), 1)
+        self.assertEqual(OutboundMessage.objects.get().attempts, 1)
+
+    def test_message_that_keeps_killing_the_worker_is_dead_lettered(self):
+        message = outbox.enqueue_sms('2551', 'hi')
+        for _ in range(2):
+            outbox.claim('sms', 10)
+            OutboundMessage.objects.update(next_attempt_at=now() - timedelta(seconds=1))
+        self.assertEqual(outbox.claim('sms', 10), [])
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('dead', 2))
+
+    @override_settings(OUTBOX_CONCURRENCY={'sms': 1, 'email': 1})
+    def test_per_channel_concurrency_limit(self):
+        outbox.enqueue_sms('2551', 'hi')
+        caches['default'].add('outbox:drain:sms:0', 1)
+        self.assertEqual(outbox.drain('sms'), 0)
+        caches['default'].delete('outbox:drain:sms:0')
+        self.assertEqual(outbox.drain('sms'), 1)
+
+    def test_cache_outage_drains_without_the_cap(self):
+        outbox.enqueue_sms('2551', 'hi')
+        with mock.patch('myapp.outbox.cache.add', side_effect=ConnectionError('redis down')):
+            self.assertEqual(outbox.drain('sms'), 1)
+        self.assertEqual(OutboundMessage.objects.get().status, 'sent')
+
+    @override_settings(OUTBOX_BATCH_SIZE=1)
+    def test_drainer_stops_when_its_slot_expires(self):
+        outbox.enqueue_sms_many([('2551', 'one'), ('2552', 'two')])
+        with mock.patch('myapp.outbox.cache.touch', side_effect=[True, False]):
+            self.assertEqual(outbox.drain('sms'), 1)
+        self.assertEqual(OutboundMessage.objects.filter(status='pending').count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, OUTBOX_BATCH_SIZE=2)
+class BroadcastTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='admin', password='pass12345', role='staff')
+        for n in range(3):
+            User.objects.create_user(username=f'exec{n}', email=f'exec{n}@example.com', role='ward_executive')
+        User.objects.create_user(username='noemail', role='ward_executive')
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_broadcast_is_queued_and_reported_per_recipient(self):
+        # One INSERT for all recipients, whatever their number
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('notify_ward_execs'), {'message': 'Meeting at 10'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(mail.outbox, [])
+
+        status_url = response.data['status_url']
+        self.assertEqual(self.client.get(status_url).data['counts']['pending'], 3)
+
+        with mock.patch('myapp.outbox.get_connection', wraps=outbox.get_connection) as get_connection:
+            self.assertEqual(outbox.drain('email'), 3)
+        # One SMTP connection per batch of OUTBOX_BATCH_SIZE
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [f'exec{n}@example.com' for n in range(3)])
+
+        data = self.client.get(status_url).data
+        self.assertTrue(data['done'])
+        self.assertEqual(data['counts']['sent'], 3)
+        self.assertEqual([r['status'] for r in data['recipients']], ['sent'] * 3)
+
+    def test_status_is_staff_only(self):
+        broadcast = outbox.enqueue_broadcast(['a@example.com'], 'Hi', 'Body')
+        self.client.force_authenticate(get_user_model().objects.get(username='exec0'))
+        self.assertEqual(self.client.get(reverse('broadcast-status', args=[broadcast.pk])).status_code, 403)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReferenceDataCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.ward = Ward.objects.create(name='Mwenge')
+        Street.objects.create(name='Uhuru', ward=self.ward)
+        self.client = APIClient()
+
+    def test_ward_list_is_cached_until_a_ward_changes(self):
+        url = reverse('get-wards')
+        first = self.client.get(url)
+        self.assertEqual(first.data, [{'id': self.ward.pk, 'name': 'Mwenge'}])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data, first.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ward.objects.create(name='Sinza')
+        self.assertEqual(len(self.client.get(url).data), 2)
+
+    def test_current_etag_gets_304(self):
+        url = reverse('get-streets-by-ward') + '?ward=Mwenge'
+        response = self.client.get(url)
+        self.assertEqual([street['name'] for street in response.data], ['Uhuru'])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Street.objects.create(name='Kigogo', ward=self.ward)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 2)
+
+    def test_unknown_ward_is_404(self):
+        response = self.client.get(reverse('get-streets-by-ward') + '?ward=Nowhere')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cache_outage_falls_back_to_the_database(self):
+        with mock.patch('myapp.reference_cache.cache.get', side_effect=ConnectionError('redis down')):
+            response = self.client.get(reverse('get-wards'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{'id': self.ward.pk, 'name': 'Mwenge'}])
+
+    def test_cache_failing_after_the_version_read_falls_back_too(self):
+        for method in ('get', 'set'):
+            caches['default'].clear()
+            with mock.patch(f'myapp.reference_cache.cache.{method}', side_effect=ConnectionError('redis down')):
+                response = self.client.get(reverse('get-wards'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, [{'id': self.ward.pk, 'name': 'Mwenge'}])
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='asha', password='pass12345', role='staff')
+        ward = Ward.objects.create(name='Mwenge')
+        self.space = OpenSpace.objects.create(name='Mwenge Grounds', latitude=-6.77, longitude=39.22, district=ward)
+        self.booking = OpenSpaceBooking.objects.create(
+            space=self.space, user=self.user, username='asha', contact='255700000000',
+            startdate=date.today(), purpose='Wedding',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_list_is_304_without_loading_rows(self):
+        url = reverse('user_bookings')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_status_change_moves_the_etag(self):
+        url = reverse('user_bookings')
+        etag = self.client.get(url)['ETag']
+        reservations.set_status(self.booking, 'rejected')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['status'], 'rejected')
+
+    def test_deleting_a_row_moves_the_etag(self):
+        OpenSpaceBooking.objects.create(
+            space=self.space, user=self.user, username='asha', contact='255700000000',
+            startdate=date.today(), purpose='Harusi',
+        )
+        url = reverse('all_booking')
+        etag = self.client.get(url)['ETag']
+        OpenSpaceBooking.objects.filter(pk=self.booking.pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_each_page_has_its_own_etag(self):
+        url = reverse('user_bookings')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url + '?page_size=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_schema_version_change_moves_the_etag(self):
+        url = reverse('user_bookings')
+        etag = self.client.get(url)['ETag']
+        with mock.patch('myapp.conditional.SCHEMA_VERSION', conditional.SCHEMA_VERSION + 1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_new_reply_moves_the_notification_etag(self):
+        report = Report.objects.create(description='Dumping', user=self.user)
+        url = reverse('user-notifications')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ReportReply.objects.create(report=report, message='On it', replied_by=self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WardDashboardTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        User = get_user_model()
+        self.ward = Ward.objects.create(name='Mwenge')
+        self.executive = User.objects.create_user(
+            username='exec', password='pass12345', role='ward_executive', ward=self.ward,
+        )
+        spaces = [
+            OpenSpace.objects.create(name=f'Space {i}', latitude=-6.77, longitude=39.22, district=self.ward)
+            for i in range(3)
+        ]
+        OpenSpace.objects.filter(pk=spaces[0].pk).update(status='unavailable')
+        for status in ('pending', 'pending', 'accepted'):
+            OpenSpaceBooking.objects.create(
+                space=spaces[1], user=self.executive, username='asha', contact='255700000000',
+                startdate=date.today(), purpose='Wedding', district='Mwenge', status=status,
+            )
+        for i in range(3):
+            report = Report.objects.create(description=f'Dumping {i}')
+            ReportForward.objects.create(report=report, to_user=self.executive)
+            if i == 0:
+                ReportForwardToadmin.objects.create(report=report, from_user=self.executive)
+        self.client = APIClient()
+        self.client.force_authenticate(self.executive)
+
+    def test_all_counts_in_one_query_per_table(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('openspace-count'))
+        self.assertEqual(response.data, {
+            'ward': 'Mwenge',
+            'openspaces': {'total': 3, 'available': 2, 'unavailable': 1},
+            'bookings': {'total': 3, 'pending': 2, 'accepted': 1, 'rejected': 0, 'completed': 0},
+            'reports': {'total': 3, 'forwarded_to_admin': 1, 'pending': 2},
+        })
+
+    def test_counts_are_cached_briefly(self):
+        first = self.client.get(reverse('openspace-count')).data
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('openspace-count')).data, first)
+
+    def test_cache_outage_falls_back_to_the_database(self):
+        with mock.patch('myapp.dashboard.cache.get', side_effect=ConnectionError('redis down')):
+            response = self.client.get(reverse('openspace-count'))
+        self.assertEqual(response.data['openspaces']['total'], 3)
+
+    def test_user_booking_stats_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('Booking numbers'))
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['accepted'], 1)
+        self.assertEqual(response.data['pending'], 2)
+
+
+class StatisticsRollupTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='admin', password='pass12345', role='staff')
+        self.ward = Ward.objects.create(name='Mwenge')
+        self.today = localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        for district in ('Mwenge', 'Mwenge', 'Sinza'):
+            Report.objects.create(description='Dumping', district=district)
+        old = Report.objects.create(description='Old', district='Mwenge')
+        Report.objects.filter(pk=old.pk).update(created_at=now() - timedelta(days=1))
+        UssdReport.objects.create(reference_number='AB12CD34', phone_number='x', description='Flood')
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_rollup_counts_per_day_and_ward(self):
+        rollups.rollup(self.yesterday, self.today)
+        counts = {
+            (stat.metric, stat.day, stat.ward): stat.count
+            for stat in DailyStat.objects.all()
+        }
+        self.assertEqual(counts, {
+            ('reports', self.today, 'Mwenge'): 2,
+            ('reports', self.today, 'Sinza'): 1,
+            ('reports', self.yesterday, 'Mwenge'): 1,
+            ('ussd_reports', self.today, ''): 1,
+        })
+
+    def test_rollup_is_idempotent_and_sees_deletions(self):
+        rollups.rollup(self.today)
+        rollups.rollup(self.today)
+        self.assertEqual(DailyStat.objects.get(metric='reports', day=self.today, ward='Mwenge').count, 2)
+        Report.objects.filter(district='Sinza').delete()
+        rollups.rollup(self.today)
+        self.assertFalse(DailyStat.objects.filter(ward='Sinza').exists())
+
+    def test_rejected_reports_are_not_counted(self):
+        Report.objects.filter(district='Sinza').update(moderation_status='rejected')
+        rollups.rollup(self.today)
+        self.assertFalse(DailyStat.objects.filter(ward='Sinza').exists())
+        result = schema.execute('{ totalReport }', context_value=mock.Mock(user=self.staff))
+        self.assertEqual(result.data['totalReport'], 3)
+
+    def test_days_are_split_at_local_midnight(self):
+        start, end = rollups.day_bounds(self.today, self.today)
+        self.assertEqual((localtime(start).date(), localtime(start).time()), (self.today, time.min))
+        self.assertEqual(end - start, timedelta(days=1))
+        Report.objects.all().delete()
+        for created_at in (start - timedelta(microseconds=1), start, end - timedelta(microseconds=1), end):
+            report = Report.objects.create(description='Edge', district='Mwenge')
+            Report.objects.filter(pk=report.pk).update(created_at=created_at)
+        self.assertEqual([count for day, ward, count in rollups.daily_counts('reports', self.today, self.today)], [2])
+
+    def test_statistics_api_reads_only_the_counters(self):
+        rollups.rollup(self.yesterday, self.today)
+        url = reverse('statistics') + f'?start={self.yesterday}&end={self.today}&metric=reports&ward={self.ward.pk}'
+        with self.assertNumQueries(2):  # the ward lookup and one grouped SUM
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals'], {'reports': 3})
+        self.assertEqual(
+            response.data['series']['reports'],
+            [{'period': self.yesterday, 'count': 1}, {'period': self.today, 'count': 2}],
+        )
+
+    def test_monthly_interval_and_bad_input(self):
+        rollups.rollup(self.yesterday, self.today)
+        response = self.client.get(reverse('statistics') + f'?start={self.today}&interval=month&metric=ussd_reports')
+        self.assertEqual(response.data['series']['ussd_reports'], [{'period': self.today.replace(day=1), 'count': 1}])
+        self.assertEqual(self.client.get(reverse('statistics') + f'?start={self.today}&metric=nope').status_code, 400)
+        self.assertEqual(self.client.get(reverse('statistics') + '?start=soon').status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(get_user_model().objects.create_user(username='asha', password='pass12345'))
+        self.assertEqual(self.client.get(reverse('statistics') + f'?start={self.today}').status_code, 403)
+
+
+class ForwardingInboxTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.ward = Ward.objects.create(name='Mwenge')
+        self.admin = User.objects.create_user(username='admin', password='pass12345', role='staff')
+        self.executive = User.objects.create_user(
+            username='exec', password='pass12345', role='ward_executive', ward=self.ward,
+        )
+        self.chairman = User.objects.create_user(username='chair', password='pass12345')
+        self.client = APIClient()
+
+    def _forward(self, count, escalate_every=2):
+        for i in range(count):
+            report = Report.objects.create(description=f'Dumping {i}', district='Mwenge')
+            ReportForward.objects.create(report=report, from_user=self.chairman, to_user=self.executive)
+            if i % escalate_every == 0:
+                ReportForwardToadmin.objects.create(report=report, from_user=self.executive, to_user=self.admin)
+
+    def test_ward_inbox_runs_one_query_whatever_its_size(self):
+        self.client.force_authenticate(self.executive)
+        url = reverse('forwarded-reports-for-ward')
+        self._forward(2)
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        self._forward(20)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 22)
+        row = response.data['results'][-1]
+        self.assertEqual(row['from_user'], 'chair')
+        self.assertTrue(row['forwarded_to_admin'])
+
+    def test_ward_inbox_filters_by_stage_and_date(self):
+        self.client.force_authenticate(self.executive)
+        self._forward(4)
+        url = reverse('forwarded-reports-for-ward')
+        pending = self.client.get(url + '?stage=pending').data['results']
+        self.assertEqual(len(pending), 2)
+        self.assertFalse(any(row['forwarded_to_admin'] for row in pending))
+        yesterday = localdate() - timedelta(days=1)
+        self.assertEqual(self.client.get(url + f'?end={yesterday}&start={yesterday}').data['results'], [])
+        self.assertEqual(self.client.get(url + '?stage=done').status_code, 400)
+
+    def test_ward_inbox_pages(self):
+        self.client.force_authenticate(self.executive)
+        self._forward(5)
+        response = self.client.get(reverse('forwarded-reports-for-ward') + '?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        ids = [row['id'] for row in response.data['results']]
+        ids += [row['id'] for row in self.client.get(response.data['next']).data['results']]
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_admin_inbox_marks_replied_reports(self):
+        self._forward(4, escalate_every=1)
+        report = Report.objects.first()
+        ReportReply.objects.create(report=report, message='Cleared', replied_by=self.admin)
+        self.client.force_authenticate(self.admin)
+        url = reverse('forwarded_reports_to_admin')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 4)
+        replied = self.client.get(url + '?stage=replied').data['results']
+        self.assertEqual([row['id'] for row in replied], [report.pk])
+        self.assertEqual(len(self.client.get(url + '?stage=open').data['results']), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReportStreetLinkTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        User = get_user_model()
+        self.mwenge = Ward.objects.create(name='Mwenge')
+        self.sinza = Ward.objects.create(name='Sinza')
+        self.uhuru = Street.objects.create(name='Uhuru', ward=self.mwenge)
+        self.uhuru_sinza = Street.objects.create(name='Uhuru', ward=self.sinza)
+        self.uhuru_kati = Street.objects.create(name='Uhuru Kati (A)', ward=self.mwenge)
+        self.executive = User.objects.create_user(username='exec', password='pass12345', role='ward_executive')
+        self.chairman = User.objects.create_user(
+            username='chair', password='pass12345', role='village_chairman', street=self.uhuru,
+            registered_by=self.executive,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.chairman)
+
+    def test_street_is_resolved_at_intake(self):
+        self.assertEqual(Report.objects.create(description='x', street='Mtaa wa UHURU', district='Mwenge').resolved_street, self.uhuru)
+        self.assertEqual(Report.objects.create(description='x', street='Uhuru', district='Sinza').resolved_street, self.uhuru_sinza)
+        self.assertEqual(Report.objects.create(description='x', street='uhuru kati', district='Mwenge').resolved_street, self.uhuru_kati)
+        self.assertIsNone(Report.objects.create(description='x', street='Nowhere').resolved_street)
+
+    def test_street_index_is_cached_until_a_street_changes(self):
+        Report.objects.create(description='x', street='Uhuru', district='Mwenge')
+        with self.assertNumQueries(0):
+            self.assertEqual(streets.resolve_street_id('Uhuru', 'Mwenge'), self.uhuru.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            kigogo = Street.objects.create(name='Kigogo', ward=self.mwenge)
+        self.assertEqual(streets.resolve_street_id('Kigogo', 'Mwenge'), kigogo.pk)
+
+    def test_chairman_inbox_uses_the_street_link(self):
+        mine = Report.objects.create(description='Dumping', street='Uhuru', district='Mwenge')
+        Report.objects.create(description='Elsewhere', street='Uhuru', district='Sinza')
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('reports-by-street'))
+        self.assertEqual([row['id'] for row in response.data], [mine.pk])
+
+    def test_forwarding_checks_the_street_link(self):
+        mine = Report.objects.create(description='Dumping', street='Uhuru', district='Mwenge')
+        other = Report.objects.create(description='Elsewhere', street='Uhuru', district='Sinza')
+        self.assertEqual(self.client.post(reverse('forward-report', args=[other.pk])).status_code, 403)
+        self.assertEqual(self.client.post(reverse('forward-report', args=[mine.pk])).status_code, 200)
+        self.assertTrue(ReportForward.objects.filter(report=mine, to_user=self.executive).exists())
+
+    def test_file_access_follows_the_street_link(self):
+        mine = Report.objects.create(description='Dumping', street='Uhuru', district='Mwenge', file='reports/a.png')
+        Report.objects.create(description='Elsewhere', street='Uhuru', district='Sinza', file='reports/b.png')
+        self.assertTrue(media_access.can_view_media(self.chairman, 'reports/a.png'))
+        self.assertFalse(media_access.can_view_media(self.chairman, 'reports/b.png'))
+
+    def test_backfill_command_links_existing_reports(self):
+        report = Report.objects.create(description='Old', street_name_backup='Uhuru', district='Mwenge')
+        Report.objects.filter(pk=report.pk).update(resolved_street=None)
+        before = Report.objects.get(pk=report.pk).updated_at
+        call_command('link_report_streets', stdout=io.StringIO())
+        report.refresh_from_db()
+        self.assertEqual(report.resolved_street, self.uhuru)
+        self.assertGreater(report.updated_at, before)
+
+
+class ReportSearchTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='admin', password='pass12345', role='staff')
+        self.dumping = Report.objects.create(description='Illegal dumping of waste', district='Mwenge', street='Uhuru')
+        self.burning = Report.objects.create(description='Burning waste at night', district='Mwenge')
+        self.elsewhere = Report.objects.create(description='Dumping near the river', district='Sinza')
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def _search(self, text):
+        response = self.client.get(reverse('report-search'), {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_all_words_must_match_across_fields(self):
+        self.assertEqual(self._search('dumping mwenge'), [self.dumping.pk])
+        self.assertEqual(sorted(self._search('waste')), sorted([self.dumping.pk, self.burning.pk]))
+
+    def test_prefixes_match_and_odd_input_is_safe(self):
+        self.assertEqual(set(self._search('dump')), {self.dumping.pk, self.elsewhere.pk})
+        self.assertEqual(set(self._search('"mwenge) *')), {self.dumping.pk, self.burning.pk})
+        self.assertEqual(self._search('*)'), [])
+
+    def test_fts5_query_quotes_every_word(self):
+        self.assertEqual(search.fts5_query('dumping "near" Mwenge-B'), '"dumping"* "near"* "Mwenge"* "B"*')
+
+    def test_index_follows_edits_and_deletes(self):
+        Report.objects.filter(pk=self.burning.pk).update(description='Flooded drainage')
+        self.assertEqual(self._search('flooded'), [self.burning.pk])
+        self.dumping.delete()
+        self.assertEqual(self._search('dumping'), [self.elsewhere.pk])
+
+    def test_results_are_paginated(self):
+        response = self.client.get(reverse('report-search'), {'q': 'waste', 'page_size': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_staff_only_and_query_required(self):
+        self.assertEqual(self.client.get(reverse('report-search')).status_code, 400)
+        self.client.force_authenticate(get_user_model().objects.create_user(username='asha', password='pass12345'))
+        self.assertEqual(self.client.get(reverse('report-search'), {'q': 'waste'}).status_code, 403)
+
+
+class HotPathIndexTests(TestCase):
+    """Seed realistic volumes, then check EXPLAIN picks the index meant for each hot query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        wards = Ward.objects.bulk_create(Ward(name=f'Ward {i}') for i in range(20))
+        cls.ward = wards[0]
+        users = User.objects.bulk_create(
+            User(username=f'user{i}', role='ward_executive' if i < 20 else 'citizen', ward=wards[i % 20])
+            for i in range(400)
+        )
+        cls.user = users[0]
+        spaces = OpenSpace.objects.bulk_create(
+            OpenSpace(
+                name=f'Space {i}', latitude=-6.7, longitude=39.2, district=wards[i % 20],
+                status='available' if i % 3 else 'unavailable',
+            )
+            for i in range(400)
+        )
+        OpenSpaceBooking.objects.bulk_create(
+            OpenSpaceBooking(
+                space=spaces[i % 400], user=users[i % 400], username='asha', contact='255700000000',
+                startdate=date.today(), purpose='Event', district=f'Ward {i % 20}',
+                status=('pending', 'accepted', 'rejected', 'completed')[i % 4],
+            )
+            for i in range(8000)
+        )
+        Notification.objects.bulk_create(
+            Notification(user=users[i % 400], message='Hi', is_read=i % 10 != 0)
+            for i in range(8000)
+        )
+        reports = Report.objects.bulk_create(
+            Report(report_id=f'R{i:011d}', description='Dumping', district=f'Ward {i % 20}')
+            for i in range(3000)
+        )
+        cls.report = reports[0]
+        ReportForward.objects.bulk_create(
+            ReportForward(report=reports[i], from_user=users[20 + i % 380], to_user=users[i % 20])
+            for i in range(3000)
+        )
+        ReportForwardToadmin.objects.bulk_create(
+            ReportForwardToadmin(report=reports[i], from_user=users[i % 20], to_user=users[i % 3])
+            for i in range(0, 3000, 2)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, name):
+        plan = queryset.explain()
+        self.assertIn(name, plan, plan)
+
+    def test_my_bookings(self):
+        self.assertUsesIndex(
+            OpenSpaceBooking.objects.filter(user=self.user).order_by('-created_at', '-id'), 'booking_user_created_idx',
+        )
+
+    def test_ward_bookings_by_status(self):
+        self.assertUsesIndex(
+            OpenSpaceBooking.objects.filter(district='Ward 0', status='pending'), 'booking_district_status_idx',
+        )
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex(Notification.objects.filter(user=self.user, is_read=False), 'notification_unread_idx')
+
+    def test_ward_executive_inbox(self):
+        self.assertUsesIndex(
+            ReportForward.objects.filter(to_user=self.user).order_by('-forwarded_at', '-id'), 'forward_to_user_idx',
+        )
+
+    def test_escalation_check(self):
+        self.assertUsesIndex(
+            ReportForwardToadmin.objects.filter(report=self.report, from_user=self.user),
+            'forward_admin_report_from_idx',
+        )
+
+    def test_ward_spaces_by_status(self):
+        self.assertUsesIndex(
+            OpenSpace.objects.filter(district=self.ward, status='available'), 'openspace_district_status_idx',
+        )
+
+
+class GeoQueryTests(TestCase):
+    # Around Mwenge, Dar es Salaam
+    LAT, LON = -6.7700, 39.2200
+
+    def setUp(self):
+        ward = Ward.objects.create(name='Mwenge')
+        self.near = OpenSpace.objects.create(name='Near', latitude=-6.7710, longitude=39.2210, district=ward)
+        self.farther = OpenSpace.objects.create(name='Farther', latitude=-6.7800, longitude=39.2300, district=ward)
+        self.far = OpenSpace.objects.create(name='Far', latitude=-6.9000, longitude=39.4000, district=ward)
+        self.client = APIClient()
+
+    def test_grid_cell_is_kept_in_step_with_the_coordinates(self):
+        self.assertEqual(self.near.grid_cell, geo.grid_cell(-6.7710, 39.2210))
+        self.near.latitude = -6.8000
+        self.near.save()
+        self.assertEqual(OpenSpace.objects.get(pk=self.near.pk).grid_cell, geo.grid_cell(-6.8, 39.2210))
+        self.assertIsNone(Report.objects.create(description='No location').grid_cell)
+
+    def test_haversine(self):
+        # One degree of latitude is about 111.2 km
+        self.assertAlmostEqual(geo.haversine_m(0, 0, 1, 0), 111195, delta=10)
+
+    def test_nearest_spaces_within_radius(self):
+        response = self.client.get(reverse('openspace-nearby'), {'lat': self.LAT, 'lon': self.LON, 'radius': 3000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.data], ['Near', 'Farther'])
+        self.assertLess(response.data[0]['distance_m'], response.data[1]['distance_m'])
+        self.assertLessEqual(response.data[1]['distance_m'], 3000)
+
+        response = self.client.get(reverse('openspace-nearby'), {'lat': self.LAT, 'lon': self.LON, 'limit': 1})
+        self.assertEqual([row['name'] for row in response.data], ['Near'])
+
+    def test_nearby_reads_only_candidate_cells(self):
+        self.assertIn('grid_cell', str(OpenSpace.objects.filter(geo.in_box(*geo.box_around(self.LAT, self.LON, 500))).query))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('openspace-nearby'), {'lat': self.LAT, 'lon': self.LON})
+
+    def test_bad_coordinates(self):
+        self.assertEqual(self.client.get(reverse('openspace-nearby'), {'lat': 'x', 'lon': 39}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('openspace-nearby'), {'lat': 95, 'lon': 39}).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse('openspace-nearby'), {'lat': -6, 'lon': 39, 'radius': 10 ** 6}).status_code, 400,
+        )
+
+    def test_report_clusters_in_box(self):
+        for lat, lon in ((-6.7701, 39.2201), (-6.7702, 39.2202), (-6.7901, 39.2401), (-7.5, 39.2)):
+            Report.objects.create(description='Dumping', latitude=lat, longitude=lon, moderation_status='approved')
+        Report.objects.create(description='Spam', latitude=-6.7703, longitude=39.2203, moderation_status='rejected')
+        Report.objects.create(description='Unchecked', latitude=-6.7704, longitude=39.2204)
+        self.client.force_authenticate(get_user_model().objects.create_user(username='asha', password='pass12345'))
+
+        box = {'south': -6.80, 'west': 39.20, 'north': -6.75, 'east': 39.25}
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('report-map'), box)
+        self.assertEqual(response.data['total'], 3)
+        clusters = sorted(response.data['clusters'], key=lambda cluster: cluster['count'])
+        self.assertEqual([cluster['count'] for cluster in clusters], [1, 2])
+        # Too few reports to show where they are: the block centre, not the report
+        self.assertAlmostEqual(clusters[0]['latitude'], -6.795)
+        self.assertAlmostEqual(clusters[0]['longitude'], 39.245)
+
+        exact = geo.clusters(Report.objects.filter(moderation_status='approved'), -6.80, 39.20, -6.75, 39.25)
+        self.assertIn((-6.7901, 39.2401), [(round(c['latitude'], 4), round(c['longitude'], 4)) for c in exact])
+
+        too_big = {'south': -8, 'west': 38, 'north': -6, 'east': 40}
+        self.assertEqual(self.client.get(reverse('report-map'), too_big).status_code, 400)
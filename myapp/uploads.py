@@ -0,0 +1,116 @@
+"""
+Helpers for the resumable chunked upload API (views.ChunkedUploadView).
+
+Chunks are streamed straight from the request into a part file under
+settings.UPLOAD_TEMP_DIR, so a worker never holds more than one read buffer
+of an upload in memory. The file type is decided from its magic bytes, not
+the client-supplied name, and the finished part file is moved into storage
+in one rename.
+"""
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils.text import get_valid_filename
+
+READ_BUFFER_SIZE = 64 * 1024
+
+# (magic bytes, content type, extension)
+FILE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+    (b'%PDF-', 'application/pdf', '.pdf'),
+]
+SNIFF_LENGTH = max(len(magic) for magic, _, _ in FILE_SIGNATURES)
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    pass
+
+
+def sniff_file_type(head):
+    """Return (content_type, extension) for the leading bytes of a file, or None."""
+    for magic, content_type, extension in FILE_SIGNATURES:
+        if head.startswith(magic):
+            return content_type, extension
+    return None
+
+
+def parse_content_range(header):
+    """Parse 'bytes start-end/total' into (start, end, total)."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise UploadError("Content-Range header must look like 'bytes start-end/total'")
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError("Invalid Content-Range")
+    return start, end, total
+
+
+def part_path(session):
+    return os.path.join(settings.UPLOAD_TEMP_DIR, f'{session.pk}.part')
+
+
+def write_chunk(session, stream, start, length):
+    """
+    Copy `length` bytes from `stream` into the session's part file at `start`.
+    Anything past the chunk (left over from an interrupted attempt) is cut off.
+    """
+    if stream is None:
+        raise UploadError("Chunk is shorter than its Content-Range")
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    path = part_path(session)
+    mode = 'r+b' if os.path.exists(path) else 'wb'
+    written = 0
+    with open(path, mode) as fh:
+        fh.seek(start)
+        while written < length:
+            data = stream.read(min(READ_BUFFER_SIZE, length - written))
+            if not data:
+                break
+            fh.write(data)
+            written += len(data)
+        if stream.read(1):
+            raise UploadError("Chunk is larger than its Content-Range")
+        fh.truncate(start + written)
+    if written != length:
+        raise UploadError("Chunk is shorter than its Content-Range")
+    return written
+
+
+def read_head(path):
+    with open(path, 'rb') as fh:
+        return fh.read(SNIFF_LENGTH)
+
+
+class _PartFile(File):
+    # FileSystemStorage moves files that expose a temporary path instead of
+    # copying them, which makes the final write a single rename.
+    def temporary_file_path(self):
+        return self.name
+
+
+def assemble(session, upload_to='reports/'):
+    """Move a fully received part file into storage and return its name."""
+    path = part_path(session)
+    file_type = sniff_file_type(read_head(path))
+    if file_type is None:
+        raise UploadError("Unsupported file type. Only PDF, JPG, and PNG are allowed.")
+    content_type, extension = file_type
+
+    stem = os.path.splitext(get_valid_filename(os.path.basename(session.filename)))[0] or 'upload'
+    with open(path, 'rb') as fh:
+        stored_name = default_storage.save(f'{upload_to}{stem}{extension}', _PartFile(fh, name=path))
+    if os.path.exists(path):
+        os.remove(path)
+    return stored_name, content_type
+
+
+def discard(session):
+    path = part_path(session)
+    if os.path.exists(path):
+        os.remove(path)
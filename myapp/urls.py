@@ -4,6 +4,8 @@ from . import views
 
 urlpatterns = [
     path('upload/', FileUploadView.as_view(), name='file-upload'),
+    path('uploads/', ChunkedUploadView.as_view(), name='chunked-upload'),
+    path('uploads/<uuid:upload_id>/', ChunkedUploadDetailView.as_view(), name='chunked-upload-detail'),
     path('ussd/', views.submit_problem_report, name='ussd'),
     path('confirm-report/<int:report_id>/', views.confirm_report, name='confirm_report'),
     path('reply-report/<int:report_id>/', views.reply_to_report, name="reply-ussd-report"),
@@ -14,6 +16,10 @@ urlpatterns = [
     path('password-reset/', SendResetPasswordEmailView.as_view(), name='password-reset'),
     path('password-reset-confirm/', PasswordResetConfirmView.as_view(), name='password-reset-confirm'),
     path('book-open-space/', OpenSpaceBookingView.as_view(), name='book-open-space'),
+    path('openspaces/availability/', OpenSpaceAvailabilityView.as_view(), name='openspace-availability'),
+    path('openspaces/calendar/', OpenSpaceCalendarView.as_view(), name='openspace-calendar'),
+    path('openspaces/nearby/', NearbyOpenSpacesView.as_view(), name='openspace-nearby'),
+    path('reports/map/', ReportMapView.as_view(), name='report-map'),
     path('district-bookings/', DistrictBookingsAPIView.as_view(), name='district-bookings'),
     path('accept-and-forward-booking/<int:booking_id>/', views.accept_and_forward_booking, name='accept-and-forward-booking'),
     path('allbooking/', AllBookingsAdminAPIView.as_view(), name="all_booking"),
@@ -23,8 +29,11 @@ urlpatterns = [
     path('bookings/<int:booking_id>/accept/', accept_booking, name='accept-booking'),
     path('user-booking-stats/', views.user_booking_stats, name='Booking numbers'),
     path('notify-ward-executives/', NotifyAllWardExecutivesView.as_view(), name='notify_ward_execs'),
+    path('broadcasts/<int:broadcast_id>/', BroadcastStatusView.as_view(), name='broadcast-status'),
+    path('statistics/', StatisticsView.as_view(), name='statistics'),
     path('notify-single-ward-executive/', NotifySingleWardExecutiveView.as_view(), name="Notify-single"),
     path('user-reports/', UserReportHistoryAPIView.as_view(), name='user-report-history'),
+    path('reports/search/', ReportSearchView.as_view(), name='report-search'),
     path('delete-booking/<int:pk>/', DeleteBookingView.as_view(), name='delete-booking'),
     path('send-notification/', SendNotificationView.as_view(), name='send-notification'),
     path('notifications/unread-count/', UnreadNotificationCountAPIView.as_view()),
@@ -19,8 +19,8 @@ client = SightengineClient('159894964', 'hN3ySs6WQRKxENgNXgGmZF82RmPxpoLe')
 def is_explicit_image(file_path):
     full_path = os.path.join(settings.MEDIA_ROOT, file_path)
     if not os.path.exists(full_path):
-        print("[⚠️ Warning] File not found:", full_path)
-        return False
+        # Unchecked is not clean; moderate_report_task retries
+        raise FileNotFoundError(full_path)
 
     result = client.check('nudity').set_file(full_path)
     nudity_data = result.get('nudity', {})
@@ -17,7 +17,6 @@ from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from better_profanity import profanity # type: ignore
 import os
-from .utils import is_explicit_image, is_inappropriate_text
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -69,9 +68,12 @@ def get_wards(request):
 @permission_classes([IsAuthenticated])
 def get_streets_for_loggedin_user_ward(request):
     user = request.user
-    if user.ward:
-        streets = Street.objects.filter(ward=user.ward)
-        return Response(StreetSerializer(streets, many=True).data)
+    if user.ward_id:
+        return reference_cache.reference_response(
+            request,
+            f'streets:ward:{user.ward_id}',
+            lambda: StreetSerializer(Street.objects.filter(ward_id=user.ward_id).select_related('ward'), many=True).data,
+        )
     return Response([])
 
 
@@ -231,12 +233,20 @@ class ReportType(DjangoObjectType):
     class Meta:
         model = Report
         fields = "__all__"
-        
-    def resolve_file_url(self, info):
-        if self.file:
-            return f"{settings.MEDIA_URL}{self.file}"
+
+    # Attachments come back as signed URLs (a bare storage name no longer
+    # resolves under MEDIA_URL), and only to viewers allowed to open them:
+    # holding a signed URL is enough to fetch the file.
+    def resolve_file(self, info):
+        if self.file and media_access.can_view_report_files(info.context.user, self):
+            return self.file.url
         return None
 
+    def resolve_file_renditions(self, info):
+        if self.file_renditions and media_access.can_view_report_files(info.context.user, self):
+            return rendition_urls(self.file_renditions)
+        return {}
+
 profanity.load_censor_words()
 
 ALLOWED_FILE_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png']
@@ -267,9 +277,6 @@ class CreateReport(graphene.Mutation):
             if ext not in ALLOWED_FILE_EXTENSIONS:
                 raise GraphQLError("Invalid file type. Only PDF, JPG, and PNG are allowed.")
 
-            if is_explicit_image(file_path):
-                raise GraphQLError("Inappropriate image content detected.")
-
         user = None
         if user_id:
             try:
@@ -277,6 +284,7 @@ class CreateReport(graphene.Mutation):
             except CustomUser.DoesNotExist:
                 raise GraphQLError("Invalid user ID.")
 
+        # Saved as pending; tasks.moderate_report_task runs the image check
         report = Report(
             description=description,
             email=email,
@@ -297,7 +305,7 @@ class ReportQuery(graphene.ObjectType):
     all_reports = graphene.List(ReportType)
     
     def resolve_all_reports(self, info):
-        return Report.objects.all()
+        return Report.objects.visible()
     
 
 class ConfirmReport(graphene.Mutation):
@@ -311,25 +319,24 @@ class ConfirmReport(graphene.Mutation):
         try:
             report = Report.objects.get(report_id=report_id)
             
-            ReportHistory.objects.create(
-                report_id = report.report_id,
-                description=report.description,
-                email=report.email,
-                file=report.file if report.file else None,
-                user=report.user  # Link the report to the original user
-            )
-            
-            # Delete the original report
-            report.delete()
-            
-            # Send email if user provided one
-            if report.email:
-                send_mail(
-                    subject="Report Confirmation",
-                    message="Your report has been reviewed and confirmed.",
+            with transaction.atomic():
+                ReportHistory.objects.create(
+                    report_id = report.report_id,
+                    description=report.description,
+                    email=report.email,
+                    file=report.file if report.file else None,
+                    user=report.user  # Link the report to the original user
+                )
+
+                # Delete the original report
+                report.delete()
+
+                # Send email if user provided one
+                outbox.enqueue_email(
+                    report.email,
+                    "Report Confirmation",
+                    "Your report has been reviewed and confirmed.",
                     from_email="limbureubenn@gmail.com",
-                    recipient_list=[report.email],
-                    fail_silently=True
                 )
                 
             return ConfirmReport(success=True, message="Report confirmed and moved to history.")
@@ -367,7 +374,7 @@ class ReportCountQuery(graphene.ObjectType):
     total_report = graphene.Int()
     
     def resolve_total_report(self, info):
-        return Report.objects.count()
+        return Report.objects.visible().count()
     
 class ReportAnonymousQuery(graphene.ObjectType):
     anonymous = graphene.List(HistoryObject, session_id=graphene.String(required=True))
@@ -482,7 +489,7 @@ from django.shortcuts import render
 import graphene
 from graphene_django import DjangoObjectType
 
-from .tasks import send_reset_email_task
+from .tasks import generate_image_renditions_task, send_reset_email_task
 from rest_framework.views import APIView # type: ignore
 from rest_framework.response import Response # type: ignore
 from rest_framework import status # type: ignore
@@ -506,7 +513,7 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.http import urlsafe_base64_decode
 from rest_framework.decorators import api_view, permission_classes
-from .booking_sms import send_sms
+from . import conditional, dashboard, geo, outbox, reference_cache, rollups, search
 
 
 # views.py
@@ -515,6 +522,24 @@ from rest_framework.response import Response # type: ignore
 from rest_framework.views import APIView # type: ignore
 from rest_framework import status # type: ignore
 from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.timezone import now
+from datetime import timedelta
+import mimetypes
+import posixpath
+from urllib.parse import quote
+from django.http import FileResponse, Http404
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from . import media_access
+from .pagination import BookingCursorPagination, ForwardCursorPagination, SearchPagination, paginated_response
+from . import reservations
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ParseError
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from . import uploads
+from .images import rendition_urls
 
 
 
@@ -543,11 +568,189 @@ class FileUploadView(APIView):
         if not file_obj:
             # No file provided, which is okay
             return Response({'file_path': None}, status=status.HTTP_200_OK)
+
+        if file_obj.size > settings.MAX_UPLOAD_SIZE:
+            return Response({'error': 'File is too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # Trust the content, not the extension
+        head = file_obj.read(uploads.SNIFF_LENGTH)
+        file_obj.seek(0)
+        if uploads.sniff_file_type(head) is None:
+            return Response({'error': 'Unsupported file type. Only PDF, JPG, and PNG are allowed.'}, status=status.HTTP_400_BAD_REQUEST)
         
         file_path = default_storage.save(f'reports/{file_obj.name}', file_obj)
         return Response({'file_path': file_path}, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadView(APIView):
+    """
+    Start a resumable upload.
+    Example payload:
+    {
+        "filename": "photo.jpg",
+        "size": 10485760
+    }
+    Then PUT the bytes to uploads/<upload_id>/ in pieces with a
+    `Content-Range: bytes start-end/total` header. GET on the same URL
+    returns the offset to resume from after a dropped connection.
+    """
+
+    def post(self, request):
+        filename = (request.data.get('filename') or '').strip()
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({'error': 'filename and size are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not filename or size <= 0:
+            return Response({'error': 'filename and size are required'}, status=status.HTTP_400_BAD_REQUEST)
+        if size > settings.MAX_UPLOAD_SIZE:
+            return Response({'error': 'File is too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        session = UploadSession.objects.create(
+            user=request.user if request.user.is_authenticated else None,
+            filename=filename[:255],
+            total_size=size,
+        )
+        return Response({
+            'upload_id': str(session.pk),
+            'offset': 0,
+            'chunk_size': settings.UPLOAD_CHUNK_SIZE,
+        }, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadDetailView(APIView):
+
+    def _get_session(self, request, upload_id):
+        session = get_object_or_404(UploadSession, pk=upload_id)
+        if session.user_id and session.user_id != getattr(request.user, 'id', None):
+            raise Http404
+        return session
+
+    def _state(self, session):
+        return {
+            'upload_id': str(session.pk),
+            'status': session.status,
+            'offset': session.received_size,
+            'size': session.total_size,
+            'file_path': session.file_path,
+        }
+
+    def get(self, request, upload_id):
+        return Response(self._state(self._get_session(request, upload_id)))
+
+    def put(self, request, upload_id):
+        self._get_session(request, upload_id)
+        try:
+            start, end, total = uploads.parse_content_range(request.headers.get('Content-Range'))
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        length = end - start + 1
+        if length > settings.UPLOAD_MAX_CHUNK_SIZE:
+            return Response({'error': 'Chunk is too large'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # Reserve the chunk under a short row lock, stream it with no
+        # transaction open (mobile clients can be slow), then record it
+        # under a second short lock.
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=upload_id)
+            if session.status != 'active':
+                return Response(self._state(session), status=status.HTTP_409_CONFLICT)
+            if total != session.total_size or end >= session.total_size:
+                return Response({'error': 'Content-Range does not match the upload size'}, status=status.HTTP_400_BAD_REQUEST)
+            if start != session.received_size:
+                return Response(self._state(session), status=status.HTTP_409_CONFLICT)
+            if session.chunk_lease_until and session.chunk_lease_until > now():
+                # Another request is still sending this chunk
+                return Response(self._state(session), status=status.HTTP_409_CONFLICT)
+            lease = now() + timedelta(seconds=settings.UPLOAD_CHUNK_LEASE_SECONDS)
+            session.chunk_lease_until = lease
+            session.save(update_fields=['chunk_lease_until', 'updated_at'])
+
+        file_path = content_type = None
+        try:
+            uploads.write_chunk(session, request.stream, start, length)
+            # Sniff as soon as the part file holds enough bytes to tell
+            if start < uploads.SNIFF_LENGTH <= end + 1:
+                if uploads.sniff_file_type(uploads.read_head(uploads.part_path(session))) is None:
+                    raise uploads.UploadError("Unsupported file type. Only PDF, JPG, and PNG are allowed.")
+        except uploads.UploadError as e:
+            UploadSession.objects.filter(pk=session.pk, chunk_lease_until=lease).update(
+                chunk_lease_until=None, updated_at=now(),
+            )
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if end + 1 == session.total_size:
+            try:
+                file_path, content_type = uploads.assemble(session)
+            except uploads.UploadError as e:
+                uploads.discard(session)
+                UploadSession.objects.filter(pk=session.pk, chunk_lease_until=lease).update(
+                    status='aborted', chunk_lease_until=None, updated_at=now(),
+                )
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=upload_id)
+            if session.status != 'active' or session.chunk_lease_until != lease:
+                # Aborted, or our lease ran out and another request took the chunk over
+                if file_path:
+                    # Not a reference of ours: the same bytes may already back a report
+                    default_storage.discard_if_unreferenced(file_path)
+                return Response(self._state(session), status=status.HTTP_409_CONFLICT)
+            session.received_size = end + 1
+            session.chunk_lease_until = None
+            if file_path:
+                session.file_path, session.content_type = file_path, content_type
+                session.status = 'complete'
+            session.save()
+
+        response_status = status.HTTP_201_CREATED if session.status == 'complete' else status.HTTP_200_OK
+        return Response(self._state(session), status=response_status)
+
+    def delete(self, request, upload_id):
+        session = self._get_session(request, upload_id)
+        if session.status == 'active':
+            uploads.discard(session)
+            session.status = 'aborted'
+            session.save()
+        return Response(status=status.HTTP_204_NO_CONTENT)
     
     
+def serve_media(request, path):
+    """
+    Authorize a media request, then let nginx send the file
+    (X-Accel-Redirect into the internal /protected-media/ location).
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('.') or '/.' in name:
+        raise Http404
+
+    if not media_access.has_valid_signature(name, request.GET):
+        user = request.user
+        try:
+            user_auth_tuple = JWTAuthentication().authenticate(request)
+            if user_auth_tuple is not None:
+                user, _ = user_auth_tuple
+        except (InvalidToken, AuthenticationFailed):
+            pass
+        if not media_access.can_view_media(user, name):
+            raise Http404
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+    else:
+        try:
+            response = FileResponse(default_storage.open(name, 'rb'), content_type=content_type)
+        except FileNotFoundError:
+            raise Http404
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
 FERNET_KEY = os.getenv('FERNET_KEY')
 fernet = Fernet(FERNET_KEY)
 
@@ -586,12 +789,13 @@ class ConfirmReportAPIView(APIView):
         try:
             report = UssdReport.objects.get(pk=pk)
             if report.status != 'processed':
-                report.status = 'processed'
-                report.save()
+                with transaction.atomic():
+                    report.status = 'processed'
+                    report.save()
 
-                # Send SMS to user
-                message = f"Hello {report.username}, your report #{report.reference} has been confirmed."
-                send_sms(report.phone_number, message)
+                    # Send SMS to user
+                    message = f"Hello {report.username}, your report #{report.reference} has been confirmed."
+                    outbox.enqueue_sms(report.phone_number, message)
 
                 return Response({'message': 'Report confirmed and SMS sent.'}, status=status.HTTP_200_OK)
             return Response({'message': 'Report already processed.'}, status=status.HTTP_200_OK)
@@ -639,7 +843,11 @@ class ProfileImageUploadView(APIView):
     def post(self, request, *args, **kwargs):
         serializer = ProfileImageUploadSerializer(instance=request.user, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            user = serializer.save()
+            transaction.on_commit(
+                lambda: generate_image_renditions_task.delay('myapp.CustomUser', user.pk),
+                robust=True,
+            )
             image_url = request.build_absolute_uri(serializer.data['profile_image'])
             return Response({'imageUrl': image_url}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -709,12 +917,9 @@ class OpenSpaceBookingView(APIView):
 
         if serializer.is_valid():
             # Save booking and associate with the logged-in user
+            # reservations.reserve() checks the dates and updates the space
             booking = serializer.save(user=request.user)
 
-            # Mark the space as unavailable
-            booking.space.status = 'unavailable'
-            booking.space.save()
-
             return Response(OpenSpaceBookingSerializer(booking).data, status=status.HTTP_201_CREATED)
 
         print("Booking validation errors:", serializer.errors)
@@ -722,11 +927,168 @@ class OpenSpaceBookingView(APIView):
 
 
 
-from django.db.models import Q
+def parse_date_range(params, max_days):
+    """(start, end) from ?start=YYYY-MM-DD[&end=YYYY-MM-DD], or ParseError."""
+    try:
+        startdate = parse_date(params.get('start', ''))
+        enddate = parse_date(params.get('end', '')) or startdate
+    except ValueError:
+        startdate = None
+    if not startdate or enddate < startdate:
+        raise ParseError("Give a valid start (and optional end) date, YYYY-MM-DD.")
+    if (enddate - startdate).days >= max_days:
+        raise ParseError(f"The date range is limited to {max_days} days.")
+    return startdate, enddate
+
+
+class OpenSpaceDateRangeView(APIView):
+    """Shared query parsing: ?start=YYYY-MM-DD[&end=YYYY-MM-DD][&ward=<id>]"""
+    max_days = 366
+
+    def parse_range(self, request):
+        startdate, enddate = parse_date_range(request.query_params, self.max_days)
+
+        spaces = OpenSpace.objects.filter(is_active=True)
+        ward = request.query_params.get('ward')
+        if ward:
+            if not ward.isdigit():
+                raise ParseError("ward must be a ward id.")
+            spaces = spaces.filter(district_id=ward)
+        return startdate, enddate, spaces
+
+
+class OpenSpaceAvailabilityView(OpenSpaceDateRangeView):
+    """Which open spaces are free for every day from start to end."""
+
+    def get(self, request):
+        startdate, enddate, spaces = self.parse_range(request)
+        spaces = reservations.with_availability(spaces, startdate, enddate).order_by('name')
+
+        return Response({
+            "start": startdate,
+            "end": enddate,
+            "spaces": [
+                {"id": space.id, "name": space.name, "ward": space.district_id, "available": space.is_free}
+                for space in spaces.only('id', 'name', 'district_id')
+            ],
+        })
+
+
+class OpenSpaceCalendarView(OpenSpaceDateRangeView):
+    """Booked days per open space from start to end, read from SpaceOccupancy."""
+
+    def get(self, request):
+        startdate, enddate, spaces = self.parse_range(request)
+
+        booked_days = {}
+        occupancy = reservations.occupied(startdate, enddate).filter(space__in=spaces)
+        for space_id, day in occupancy.order_by('day').values_list('space_id', 'day'):
+            booked_days.setdefault(space_id, []).append(day)
+
+        return Response({
+            "start": startdate,
+            "end": enddate,
+            "spaces": [
+                {
+                    "id": space.id,
+                    "name": space.name,
+                    "ward": space.district_id,
+                    "available": space.id not in booked_days,
+                    "booked_days": booked_days.get(space.id, []),
+                }
+                for space in spaces.order_by('name').only('id', 'name', 'district_id')
+            ],
+        })
+
+
+def _float_param(params, name, low, high, default=None):
+    value = params.get(name)
+    if value in (None, ''):
+        if default is None:
+            raise ParseError(f"{name} is required.")
+        return default
+    try:
+        value = float(value)
+    except ValueError:
+        raise ParseError(f"{name} must be a number.")
+    if not low <= value <= high:
+        raise ParseError(f"{name} must be between {low} and {high}.")
+    return value
+
+
+class NearbyOpenSpacesView(APIView):
+    """Active open spaces closest to a point: ?lat=&lon=[&radius=metres][&limit=]"""
+    max_radius_m = 20000
+    max_limit = 50
+
+    def get(self, request):
+        params = request.query_params
+        lat = _float_param(params, 'lat', -90, 90)
+        lon = _float_param(params, 'lon', -180, 180)
+        radius = _float_param(params, 'radius', 1, self.max_radius_m, default=2000)
+        limit = int(_float_param(params, 'limit', 1, self.max_limit, default=10))
+
+        spaces = OpenSpace.objects.filter(is_active=True).only(
+            'id', 'name', 'latitude', 'longitude', 'status', 'district_id',
+        )
+        return Response([
+            {
+                "id": space.id,
+                "name": space.name,
+                "latitude": space.latitude,
+                "longitude": space.longitude,
+                "status": space.status,
+                "ward": space.district_id,
+                "distance_m": round(space.distance_m),
+            }
+            for space in geo.nearest(spaces, lat, lon, radius, limit)
+        ])
+
+
+class ReportMapView(APIView):
+    """
+    Approved reports inside a map box, grouped for drawing as clusters:
+    ?south=&west=&north=&east= (degrees)
+    """
+    permission_classes = [IsAuthenticated]
+    max_span = 0.5  # degrees, about 55 km
+    min_exact = 5  # smaller clusters are drawn at their block's centre
+
+    def get(self, request):
+        params = request.query_params
+        south = _float_param(params, 'south', -90, 90)
+        north = _float_param(params, 'north', -90, 90)
+        west = _float_param(params, 'west', -180, 180)
+        east = _float_param(params, 'east', -180, 180)
+        if south > north or west > east:
+            raise ParseError("The box must have south <= north and west <= east.")
+        if max(north - south, east - west) > self.max_span:
+            raise ParseError(f"The box may span at most {self.max_span} degrees; zoom in.")
+
+        reports = Report.objects.filter(moderation_status='approved')
+        clusters = geo.clusters(reports, south, west, north, east, min_exact=self.min_exact)
+        return Response({
+            "total": sum(cluster["count"] for cluster in clusters),
+            "clusters": clusters,
+        })
+
+
+from django.db.models import Exists, OuterRef, Q
+
+def _district_booking_versions(request):
+    user = request.user
+    if user.role != "ward_executive":
+        return None
+    return [
+        (OpenSpaceBooking.objects.filter(district=user.ward), 'updated_at'),
+        (ForwardedBooking.objects.filter(booking__district=user.ward), 'forwarded_at'),
+    ]
+
 
 class DistrictBookingsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional.etag_from(_district_booking_versions, vary=media_access.current_expiry)
     def get(self, request):
         user = request.user
 
@@ -734,12 +1096,11 @@ class DistrictBookingsAPIView(APIView):
             return Response({"error": "Unauthorized"}, status=403)
 
         forwarded_booking_ids = ForwardedBooking.objects.values_list('booking_id', flat=True)
-        bookings = OpenSpaceBooking.objects.filter(
+        bookings = OpenSpaceBooking.objects.for_listing().filter(
             district=user.ward
         ).exclude(id__in=forwarded_booking_ids)
 
-        serializer = OpenSpaceBookingSerializer(bookings, many=True)
-        return Response(serializer.data)
+        return paginated_response(BookingCursorPagination, bookings, OpenSpaceBookingSerializer, request, self)
 
     
 
@@ -780,14 +1141,18 @@ class ForwadedBookingAPIView(APIView):
 
 class AllBookingsAdminAPIView(APIView):
     permission_classes = [IsAuthenticated]
+
+    @conditional.etag_from(
+        lambda request: [(OpenSpaceBooking.objects.all(), 'updated_at')] if request.user.role == "staff" else None,
+        vary=media_access.current_expiry,
+    )
     def get(self, request):
         user = request.user
 
         if user.role != "staff":
             return Response({"error": "Unauthorized"}, status=403)
-        bookings = OpenSpaceBooking.objects.all().order_by('-created_at')
-        serializer = OpenSpaceBookingSerializer(bookings, many=True)
-        return Response(serializer.data)
+        bookings = OpenSpaceBooking.objects.for_listing()
+        return paginated_response(BookingCursorPagination, bookings, OpenSpaceBookingSerializer, request, self)
     
 
 
@@ -796,23 +1161,17 @@ def reject_booking(request, booking_id):
     try:
         booking = OpenSpaceBooking.objects.get(id=booking_id)
 
-        # Update booking status
-        booking.status = 'rejected'
-        booking.save()
-
-        # Update OpenSpace status to available
-        booking.space.status = 'available'
-        booking.space.save()
+        with transaction.atomic():
+            # Update booking status; this frees its dates
+            reservations.set_status(booking, 'rejected')
 
-        # Send rejection email if email exists
-        user_email = None
-        if booking.user and booking.user.email:
-            user_email = booking.user.email
-        elif hasattr(booking, 'email') and booking.email:
-            user_email = booking.email
+            # Send rejection email if email exists
+            user_email = None
+            if booking.user and booking.user.email:
+                user_email = booking.user.email
+            elif hasattr(booking, 'email') and booking.email:
+                user_email = booking.email
 
-        if user_email:
-            subject = 'Your Booking Has Been Rejected'
             message = f"""
 Hello {booking.username},
 
@@ -821,21 +1180,11 @@ The space is now available for others.
 
 Thank you for understanding.
 """
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [user_email],
-                fail_silently=True
-            )
+            outbox.enqueue_email(user_email, 'Your Booking Has Been Rejected', message)
 
-        # Send SMS notification if contact exists
-        if booking.contact:
+            # Send SMS notification if contact exists
             sms_message = f"Hello {booking.username}, your booking for {booking.space.name} from {booking.startdate} to {booking.enddate} has been Rejected please Visit your ward office for more information."
-            try:
-                send_sms(phone=booking.contact, message=sms_message)
-            except Exception as e:
-                print("Failed to send rejection SMS:", e)
+            outbox.enqueue_sms(booking.contact, sms_message)
 
         return Response({'message': 'Booking rejected successfully.'}, status=status.HTTP_200_OK)
 
@@ -852,25 +1201,20 @@ def accept_booking(request, booking_id):
     try:
         booking = OpenSpaceBooking.objects.get(id=booking_id)
 
-        # 1. Update booking status to 'accepted'
-        booking.status = 'accepted'
-        booking.save()
-
-        # 2. Mark open space as 'unavailable'
-        booking.space.status = 'unavailable'
-        booking.space.save()
+        with transaction.atomic():
+            # 1. Update booking status to 'accepted' (fails if the dates were given away)
+            try:
+                reservations.set_status(booking, 'accepted')
+            except reservations.BookingConflict as e:
+                return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
 
-        # 3. Send SMS notification to user
-        if booking.contact:
+            # 2. Queue the SMS notification to the user
             sms_message = (
                 f"Hello {booking.username}, your booking for {booking.space.name} "
                 f"from {booking.startdate} to {booking.enddate} has been ACCEPTED. "
                 f"Please prepare accordingly."
             )
-            try:
-                send_sms(phone=booking.contact, message=sms_message)
-            except Exception as e:
-                print("Failed to send acceptance SMS:", e)
+            outbox.enqueue_sms(booking.contact, sms_message)
 
         return Response({'message': 'Booking accepted and user notified.'}, status=status.HTTP_200_OK)
 
@@ -885,25 +1229,31 @@ class UserBooking(APIView):
 
     def get(self, request):
         user = request.user
-        bookings = OpenSpaceBooking.objects.filter(user=user).order_by('-created_at')
-        serializer = OpenSpaceBookingSerializer(bookings, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        bookings = OpenSpaceBooking.objects.for_listing().filter(user=user)
+        return paginated_response(BookingCursorPagination, bookings, OpenSpaceBookingSerializer, request, self)
 
 from rest_framework import generics, permissions
 
 class MyBookingsView(generics.ListAPIView):
     serializer_class = OpenSpaceBookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingCursorPagination
 
     def get_queryset(self):
         # Get bookings for the logged-in user
-        return OpenSpaceBooking.objects.filter(user=self.request.user).order_by('-created_at')
+        return OpenSpaceBooking.objects.for_listing().filter(user=self.request.user)
+
+    @conditional.etag_from(
+        lambda request: [(OpenSpaceBooking.objects.filter(user=request.user), 'updated_at')],
+        vary=media_access.current_expiry,
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
 
 
 from rest_framework.decorators import api_view # type: ignore
 from rest_framework.response import Response # type: ignore
-from .sms import send_sms
 from .utils import decrypt_phone_number
 
 @api_view(['POST'])
@@ -918,11 +1268,12 @@ def confirm_report(request, report_id):
             f"Thank you for helping us improve our community."
         )
 
-        response = send_sms(decrypted_phone, message)
-        report.status = 'processed'
-        report.save()
+        with transaction.atomic():
+            report.status = 'processed'
+            report.save()
+            outbox.enqueue_sms(decrypted_phone, message)
 
-        return Response({"status": "success", "data": response})
+        return Response({"status": "success"})
 
     except UssdReport.DoesNotExist:
         return Response({"status": "error", "message": "Report not found"}, status=404)
@@ -942,9 +1293,9 @@ def reply_to_report(request, report_id):
         if not custom_message:
             return Response({"status": "error", "message": "Message content is required"}, status=400)
 
-        response = send_sms(decrypted_phone, custom_message)
+        outbox.enqueue_sms(decrypted_phone, custom_message)
 
-        return Response({"status": "success", "message": "Reply sent successfully", "data": response})
+        return Response({"status": "success", "message": "Reply sent successfully"})
 
     except UssdReport.DoesNotExist:
         return Response({"status": "error", "message": "Report not found"}, status=404)
@@ -976,7 +1327,7 @@ class DeleteBookingAPIView(APIView):
             if request.user != booking.user and not request.user.is_staff:
                 return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
 
-            booking.delete()
+            reservations.cancel(booking)
             return Response({'message': 'Booking deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
         except OpenSpaceBooking.DoesNotExist:
@@ -987,18 +1338,7 @@ class DeleteBookingAPIView(APIView):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_booking_stats(request):
-    user = request.user
-    bookings = OpenSpaceBooking.objects.filter(user=user)
-
-    total = bookings.count()
-    accepted = bookings.filter(status='accepted').count()
-    pending = bookings.filter(status='pending').count()
-
-    return Response({
-        'total': total,
-        'accepted': accepted,
-        'pending': pending
-    })
+    return Response(dashboard.booking_counts(OpenSpaceBooking.objects.filter(user=request.user)))
 
 
 class NotifyAllWardExecutivesView(APIView):
@@ -1009,16 +1349,84 @@ class NotifyAllWardExecutivesView(APIView):
 
         ward_executives = CustomUser.objects.filter(role='ward_executive').exclude(email='')
 
-        for executive in ward_executives:
-            send_mail(
-                subject='Notification from Kinondoni Municipal',
-                message=message,
-                from_email='limbureubenn@gmail.com',
-                recipient_list=[executive.email],
-                fail_silently=True
+        # Delivered in the background over shared SMTP connections; poll the status URL
+        with transaction.atomic():
+            broadcast = outbox.enqueue_broadcast(
+                ward_executives.values_list('email', flat=True),
+                'Notification from Kinondoni Municipal',
+                message,
+                created_by=request.user if request.user.is_authenticated else None,
             )
 
-        return Response({'success': 'Notifications sent to all ward executives.'}, status=status.HTTP_200_OK)
+        return Response({
+            'success': 'Notifications queued for all ward executives.',
+            'broadcast_id': broadcast.id,
+            'status_url': reverse('broadcast-status', args=[broadcast.id]),
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class BroadcastStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, broadcast_id):
+        if request.user.role != 'staff' and not request.user.is_staff:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        broadcast = get_object_or_404(Broadcast, pk=broadcast_id)
+
+        recipients = list(broadcast.messages.order_by('recipient').values('recipient', 'status', 'attempts', 'last_error', 'sent_at'))
+        counts = {key: 0 for key, _ in OutboundMessage.STATUS_CHOICES}
+        for recipient in recipients:
+            counts[recipient['status']] += 1
+
+        return Response({
+            'id': broadcast.id,
+            'subject': broadcast.subject,
+            'created_at': broadcast.created_at,
+            'total': len(recipients),
+            'counts': counts,
+            'done': counts['pending'] + counts['sending'] == 0,
+            'recipients': recipients,
+        })
+
+
+class StatisticsView(APIView):
+    """
+    Time series for the admin charts, read from the DailyStat counters (see
+    rollups.py): ?start=YYYY-MM-DD[&end=...][&metric=reports&metric=...]
+    [&ward=<id>][&interval=day|month]
+    """
+    permission_classes = [IsAuthenticated]
+    max_days = 5 * 366
+
+    def get(self, request):
+        if request.user.role != 'staff' and not request.user.is_staff:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        startdate, enddate = parse_date_range(request.query_params, self.max_days)
+
+        metrics = request.query_params.getlist('metric') or list(rollups.SOURCES)
+        unknown = set(metrics) - set(rollups.SOURCES)
+        if unknown:
+            raise ParseError(f"Unknown metric(s): {', '.join(sorted(unknown))}.")
+        interval = request.query_params.get('interval', 'day')
+        if interval not in rollups.INTERVALS:
+            raise ParseError("interval must be 'day' or 'month'.")
+        ward = request.query_params.get('ward')
+        if ward:
+            if not ward.isdigit():
+                raise ParseError("ward must be a ward id.")
+            ward = get_object_or_404(Ward, pk=ward).name
+
+        data = rollups.series(startdate, enddate, metrics, ward=ward or None, interval=interval)
+        return Response({
+            'start': startdate,
+            'end': enddate,
+            'interval': interval,
+            'totals': {metric: sum(count for _, count in points) for metric, points in data.items()},
+            'series': {
+                metric: [{'period': period, 'count': count} for period, count in points]
+                for metric, points in data.items()
+            },
+        })
 
 
 class NotifySingleWardExecutiveView(APIView):
@@ -1029,13 +1437,7 @@ class NotifySingleWardExecutiveView(APIView):
         if not email or not message:
             return Response({'error': 'Email and message are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        send_mail(
-            subject='Notification from Kinondoni Municipal',
-            message=message,
-            from_email='admin@example.com',  # Replace with your configured email
-            recipient_list=[email],
-            fail_silently=True
-        )
+        outbox.enqueue_email(email, 'Notification from Kinondoni Municipal', message)
 
         return Response({'success': f'Notification sent to {email}'}, status=status.HTTP_200_OK)
 
@@ -1044,12 +1446,30 @@ class NotifySingleWardExecutiveView(APIView):
 class UserReportHistoryAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional.etag_from(
+        lambda request: [(Report.objects.filter(user=request.user), 'updated_at')],
+        vary=media_access.current_expiry,
+    )
     def get(self, request):
         reports = Report.objects.filter(user=request.user).order_by('-created_at')
         serializer = ReportSerializer(reports, many=True)
         return Response(serializer.data)
 
 
+class ReportSearchView(APIView):
+    """Staff search over reports, best match first: ?q=dumping mwenge[&page=N]"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != 'staff' and not request.user.is_staff:
+            return Response({'error': 'Unauthorized'}, status=status.HTTP_403_FORBIDDEN)
+        text = request.query_params.get('q', '').strip()
+        if len(text) < 2:
+            raise ParseError("Give a search text of at least 2 characters in ?q=.")
+
+        reports = search.search_reports(Report.objects.visible(), text)
+        return paginated_response(SearchPagination, reports, ReportSerializer, request, self)
+
 
 class DeleteBookingView(generics.DestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -1067,7 +1487,7 @@ class DeleteBookingView(generics.DestroyAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        booking.delete()
+        reservations.cancel(booking)
         return Response({'message': 'Booking deleted successfully.'}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -1126,8 +1546,9 @@ class VillageChairmenByWardView(APIView):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_wards(request):
-    wards = Ward.objects.all().values('id', 'name')
-    return Response(wards)
+    return reference_cache.reference_response(
+        request, 'wards', lambda: list(Ward.objects.all().values('id', 'name')),
+    )
 
 
 @api_view(['GET'])
@@ -1137,14 +1558,16 @@ def get_streets_by_ward(request):
     if not ward_name:
         return Response({"error": "Ward name is required"}, status=400)
 
-    try:
-        ward = Ward.objects.get(name=ward_name)
-    except Ward.DoesNotExist:
-        return Response({"error": "Ward not found"}, status=404)
+    def build():
+        streets = Street.objects.filter(ward__name=ward_name)
+        if not streets.exists() and not Ward.objects.filter(name=ward_name).exists():
+            return None
+        return SimpleStreetSerializer(streets, many=True).data
 
-    streets = Street.objects.filter(ward=ward)
-    serializer = SimpleStreetSerializer(streets, many=True)
-    return Response(serializer.data)
+    response = reference_cache.reference_response(request, f'streets:ward-name:{ward_name}', build)
+    if response.status_code == 200 and response.data is None:
+        return Response({"error": "Ward not found"}, status=404)
+    return response
 
 
 
@@ -1165,23 +1588,16 @@ def create_report(request):
 
 
 
-from django.db.models.functions import Lower
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def reports_by_street_name_match(request):
     user = request.user
 
-    if not user.street:
+    if not user.street_id:
         return Response({'error': 'User is not assigned to any street'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Normalize user street name
-    user_street_name = user.street.name.strip().lower()
-
-    # Match using __icontains for more flexible match
-    reports = Report.objects.annotate(
-        street_lower=Lower('street')
-    ).filter(street_lower__icontains=user_street_name).order_by('-created_at')
+    reports = Report.objects.visible().filter(resolved_street_id=user.street_id).order_by('-created_at')
 
     serializer = ReportSerializer(reports, many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1189,14 +1605,6 @@ def reports_by_street_name_match(request):
 
 
 
-import re
-def normalize_street(name):
-    """Normalize street name: lowercase, remove parentheses content, trim spaces"""
-    if not name:
-        return ""
-    name = re.sub(r'\(.*?\)', '', name)  # remove text inside parentheses
-    return name.strip().lower()
-
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def forward_report_to_ward_exec(request, report_id):
@@ -1210,13 +1618,8 @@ def forward_report_to_ward_exec(request, report_id):
     except Report.DoesNotExist:
         return Response({'error': 'Report not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Normalize street names
-    report_street = normalize_street(report.street or report.street_name_backup)
-    user_street = normalize_street(user.street.name if user.street else "")
-
     # Ensure report belongs to chairman's street
-    if user_street not in report_street:
-        print(f"Street mismatch: report='{report_street}' vs user='{user_street}'")
+    if not user.street_id or report.resolved_street_id != user.street_id:
         return Response({'error': 'This report does not belong to your street'}, status=status.HTTP_403_FORBIDDEN)
 
     # Check if already forwarded
@@ -1305,44 +1708,63 @@ def reply_to_report(request, report_id):
 #     return Response(reports_data, status=200)
 
 
+def _forward_inbox(request, forwards, fields):
+    """
+    One page of a forwarding inbox in a single query: `forwards` is already
+    annotated, `fields` maps output keys to .values() lookups. Filters by
+    ?start=&end= (date forwarded), newest first, cursor-paginated.
+    """
+    params = request.query_params
+    if 'start' in params or 'end' in params:
+        start, end = rollups.day_bounds(*parse_date_range(params, max_days=5 * 366))
+        forwards = forwards.filter(forwarded_at__gte=start, forwarded_at__lt=end)
+
+    paginator = ForwardCursorPagination()
+    page = paginator.paginate_queryset(forwards.values('id', 'forwarded_at', *fields.values()), request)
+    return paginator.get_paginated_response([
+        {key: row[lookup] for key, lookup in fields.items()}
+        for row in page
+    ])
+
+
+def _stage_filter(request, stages):
+    """The ?stage= value, which must be one of `stages` (or absent)."""
+    stage = request.query_params.get('stage')
+    if stage and stage not in stages:
+        raise ParseError(f"stage must be one of: {', '.join(stages)}.")
+    return stage
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def forwarded_reports_for_ward(request):
     """
-    Fetch all reports forwarded to the logged-in ward executive.
+    Fetch reports forwarded to the logged-in ward executive.
+    ?stage=pending|forwarded_to_admin, ?start=&end=, cursor-paginated.
     """
     user = request.user
 
     if user.role != 'ward_executive':
         return Response({'error': 'Only ward executives can access this'}, status=403)
 
-    # Fetch all ReportForward entries where the logged-in user is the recipient
-    forwarded = (
-        ReportForward.objects
-        .filter(to_user=user)
-        .select_related('report', 'from_user')
-        .order_by('-forwarded_at')
-    )
-
-    reports_data = []
-    for f in forwarded:
-        reports_data.append({
-            'id': f.id,  # <-- Forward record ID (needed for forwarding to admin)
-            'report_id': f.report.report_id,
-            'space_name': f.report.space_name,
-            'district': f.report.district,
-            'street': f.report.street,
-            'description': f.report.description,
-            'from_user': f.from_user.username if f.from_user else None,
-            'forwarded_at': f.forwarded_at,
-            # Check if already forwarded to admin by this ward executive
-            'forwarded_to_admin': ReportForwardToadmin.objects.filter(
-                report=f.report,
-                from_user=user
-            ).exists()
-        })
-
-    return Response(reports_data, status=200)
+    # Whether this ward executive already forwarded the report to admin
+    escalated = ReportForwardToadmin.objects.filter(report=OuterRef('report'), from_user=user)
+    forwards = ReportForward.objects.filter(to_user=user).annotate(forwarded_to_admin=Exists(escalated))
+    stage = _stage_filter(request, ('pending', 'forwarded_to_admin'))
+    if stage:
+        forwards = forwards.filter(forwarded_to_admin=(stage == 'forwarded_to_admin'))
+
+    return _forward_inbox(request, forwards, {
+        'id': 'id',  # Forward record ID (needed for forwarding to admin)
+        'report_id': 'report__report_id',
+        'space_name': 'report__space_name',
+        'district': 'report__district',
+        'street': 'report__street',
+        'description': 'report__description',
+        'from_user': 'from_user__username',
+        'forwarded_at': 'forwarded_at',
+        'forwarded_to_admin': 'forwarded_to_admin',
+    })
 
 
 
@@ -1389,39 +1811,41 @@ def forward_report_to_admin_from_village(request, forward_id):
 @permission_classes([IsAuthenticated])
 def forwarded_reports_to_admin(request):
     """
-    Fetch all reports forwarded to the logged-in admin.
+    Fetch reports forwarded to the logged-in admin.
+    ?stage=open|replied, ?start=&end=, cursor-paginated.
     """
     user = request.user
 
     if user.role != 'staff':  # only admins
         return Response({'error': 'Only admin users can access this'}, status=403)
 
-    # Fetch all ReportForwardToadmin entries for this admin
-    forwarded = (
-        ReportForwardToadmin.objects
-        .filter(to_user=user)
-        .select_related('report', 'from_user')
-        .order_by('-forwarded_at')
-    )
-
-    reports_data = []
-    for f in forwarded:
-        reports_data.append({
-            'id': f.report.id,  # Forward record ID
-            'report_id': f.report.report_id,
-            'space_name': f.report.space_name,
-            'latitude': f.report.latitude,
-            'longitude': f.report.longitude,
-            'district': f.report.district,
-            'street': f.report.street,
-            'description': getattr(f.report, 'description', ''),
-            'from_user': f.from_user.username if f.from_user else None,
-            'message': getattr(f, 'message', ''),  # include if you added message field
-            'forwarded_at': f.forwarded_at,
-            'file': f.report.file.url if hasattr(f.report, 'file') and f.report.file else None
-        })
-
-    return Response(reports_data, status=200)
+    # Whether anyone has replied to the reporter yet
+    replied = ReportReply.objects.filter(report=OuterRef('report'))
+    forwards = ReportForwardToadmin.objects.filter(to_user=user).annotate(replied=Exists(replied))
+    stage = _stage_filter(request, ('open', 'replied'))
+    if stage:
+        forwards = forwards.filter(replied=(stage == 'replied'))
+
+    response = _forward_inbox(request, forwards, {
+        'id': 'report__id',
+        'report_id': 'report__report_id',
+        'space_name': 'report__space_name',
+        'latitude': 'report__latitude',
+        'longitude': 'report__longitude',
+        'district': 'report__district',
+        'street': 'report__street',
+        'description': 'report__description',
+        'from_user': 'from_user__username',
+        'message': 'message',
+        'forwarded_at': 'forwarded_at',
+        'file': 'report__file',
+        'file_renditions': 'report__file_renditions',
+        'replied': 'replied',
+    })
+    for row in response.data['results']:
+        row['file'] = default_storage.url(row['file']) if row['file'] else None
+        row['file_renditions'] = rendition_urls(row['file_renditions'])
+    return response
 
 
 
@@ -1455,9 +1879,9 @@ class WardRegisterAPIView(APIView):
         """
         List all wards for dropdowns.
         """
-        wards = Ward.objects.all()
-        serializer = WardSerializer(wards, many=True)
-        return Response({"wards": serializer.data})
+        return reference_cache.reference_response(
+            request, 'wards-admin', lambda: {"wards": WardSerializer(Ward.objects.all(), many=True).data},
+        )
 
 class IsAdminUser(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -1471,12 +1895,9 @@ class StreetRegisterAPIView(APIView):
         """
         Return all wards for dropdown + optional list of streets
         """
-        wards = Ward.objects.all()
-        streets = Street.objects.select_related('ward').all()
-
-        return Response({
-            "wards": WardSerializer(wards, many=True).data,
-            "streets": StreetSerializer(streets, many=True).data
+        return reference_cache.reference_response(request, 'streets-register', lambda: {
+            "wards": WardSerializer(Ward.objects.all(), many=True).data,
+            "streets": StreetSerializer(Street.objects.select_related('ward').all(), many=True).data
         })
 
     def post(self, request):
@@ -1569,22 +1990,18 @@ class ReportReplyView(APIView):
 
         serializer = ReportReplySerializer(data=request.data)
         if serializer.is_valid():
-            reply = serializer.save(report=report, replied_by=user)
-            message = serializer.validated_data['message']
-
-            # Optional: Send email to reporter
-            recipient_email = report.user.email if report.user and report.user.email else report.email
-            if recipient_email:
-                try:
-                    send_mail(
-                        subject=f"Response to your report {report.report_id}",
-                        message=message,
-                        from_email='limbureubenn@gmail.com',
-                        recipient_list=[recipient_email],
-                        fail_silently=True
-                    )
-                except Exception as e:
-                    print(f"Failed to send reply email: {e}")
+            with transaction.atomic():
+                reply = serializer.save(report=report, replied_by=user)
+                message = serializer.validated_data['message']
+
+                # Optional: Send email to reporter
+                recipient_email = report.user.email if report.user and report.user.email else report.email
+                outbox.enqueue_email(
+                    recipient_email,
+                    f"Response to your report {report.report_id}",
+                    message,
+                    from_email='limbureubenn@gmail.com',
+                )
 
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -1592,15 +2009,20 @@ class ReportReplyView(APIView):
 
 
 # views.py
+def _reply_versions(request):
+    return [(ReportReply.objects.filter(report__user=request.user), 'created_at')]
+
+
 class UserNotificationsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional.etag_from(_reply_versions)
     def get(self, request):
         """
         Fetch all replies as notifications for the logged-in user.
         """
         reports = Report.objects.filter(user=request.user)
-        replies = ReportReply.objects.filter(report__in=reports).order_by('-created_at')
+        replies = ReportReply.objects.filter(report__in=reports).select_related('report', 'replied_by').order_by('-created_at')
         serializer = ReportNotificationSerializer(replies, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -1616,6 +2038,7 @@ class UserNotificationsView(APIView):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional.etag_from(_reply_versions)
 def get_report_replies(request):
     user = request.user
     reports = Report.objects.filter(user=user)  # only the user's reports
@@ -1643,26 +2066,4 @@ class WardDashboardCountView(APIView):
         if user.role != 'ward_executive' or not user.ward:
             return Response({"error": "Only ward executives can access this"}, status=403)
 
-        # --- OpenSpaces counts ---
-        total_openspaces = OpenSpace.objects.filter(district=user.ward).count()
-        available_openspaces = OpenSpace.objects.filter(district=user.ward, status="available").count()
-        unavailable_openspaces = OpenSpace.objects.filter(district=user.ward, status="unavailable").count()
-
-        # --- Reports counts ---
-        total_reports = ReportForward.objects.filter(to_user=user).count()
-        forwarded_to_admin = ReportForwardToadmin.objects.filter(from_user=user).count()
-        pending_reports = total_reports - forwarded_to_admin
-
-        return Response({
-            "ward": user.ward.name,
-            "openspaces": {
-                "total": total_openspaces,
-                "available": available_openspaces,
-                "unavailable": unavailable_openspaces,
-            },
-            "reports": {
-                "total": total_reports,
-                "forwarded_to_admin": forwarded_to_admin,
-                "pending": pending_reports,
-            }
-        })
\ No newline at end of file
+        return Response(dashboard.ward_dashboard(user))
\ No newline at end of file
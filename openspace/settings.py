@@ -73,6 +73,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'myapp',
     # 'myapprest',
     #third party apps
@@ -130,6 +131,28 @@ CHANNEL_LAYERS = {
 
 
 
+# Cache
+# The caches get their own Redis (the `cache` service in docker-compose), run
+# with maxmemory-policy volatile-lru: entries with a TTL are evicted
+# least-recently-used first, and the few keys written without one (the
+# reference-data version counter) are never evicted. The broker/Channels
+# Redis (REDIS_URL) has no memory cap, so eviction never touches its data.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/1')
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_REDIS_URL,
+    },
+    "moderation": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": CACHE_REDIS_URL,
+        "KEY_PREFIX": "moderation",
+        "TIMEOUT": int(os.getenv('MODERATION_CACHE_TTL', 60 * 60 * 24 * 7)),
+    },
+}
+
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -286,8 +309,34 @@ BACKEND_URL = os.getenv('BACKEND_URL', 'http://127.0.0.1:8000')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Media requests are authorized by myapp.views.serve_media. Behind nginx the
+# file itself is sent via X-Accel-Redirect from the internal /protected-media/
+# location; without nginx (runserver) Django streams it.
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', str(not DEBUG)) == 'True'
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_URL_TTL = int(os.getenv('MEDIA_URL_TTL', 6 * 60 * 60))
+
+# Uploaded media is deduplicated by content hash (see myapp/storage.py)
+STORAGES = {
+    "default": {
+        "BACKEND": "myapp.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800
 
+# Chunked uploads (see myapp/uploads.py). Part files live under MEDIA_ROOT so
+# the final move into storage is a same-filesystem rename; nginx denies them.
+MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 20 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 5 * 1024 * 1024
+UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, '.uploads')
+UPLOAD_SESSION_TTL_HOURS = 24
+UPLOAD_CHUNK_LEASE_SECONDS = 600  # how long one PUT may take to send its chunk
+
 # SMS & Encryption Configuration
 AT_USERNAME = os.getenv('AT_USERNAME', 'sandbox')
 AT_API_KEY = os.getenv('AT_API_KEY', '')
@@ -295,7 +344,34 @@ FERNET_KEY = os.getenv('FERNET_KEY', '1r5qIiRHx6Jwjl1wXDxFIppfQbMCGhlW1ScTc7tmSY
 
 BEEM_API_KEY = os.getenv('BEEM_API_KEY', '')
 BEEM_SECRET_KEY = os.getenv('BEEM_SECRET_KEY', '')
-BEEM_SENDER_ID = os.getenv('BEEM_SENDER_ID', 'OPENSPACE')
+BEEM_SENDER_ID = os.getenv('BEEM_SENDER_ID', '')
+
+# Outgoing SMS (see myapp/sms_gateway.py)
+# Use 'myapp.sms_gateway.FakeGateway' to record messages instead of sending them
+SMS_BACKEND = os.getenv('SMS_BACKEND', 'myapp.sms_gateway.BeemGateway')
+SMS_RATE_PER_SECOND = float(os.getenv('SMS_RATE_PER_SECOND', 5))  # gateway requests, per process
+SMS_BATCH_SIZE = 100  # recipients per Beem request
+SMS_TIMEOUT = (5, 15)  # connect, read (seconds)
+SMS_MAX_RETRIES = 3
+SMS_RETRY_BACKOFF = 1  # seconds, doubled on every retry
+
+# Outbound message outbox (see myapp/outbox.py)
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8  # then the message is dead-lettered
+OUTBOX_RETRY_BACKOFF = 30  # seconds, doubled on every attempt
+OUTBOX_LEASE_SECONDS = 300  # a claimed batch is retried if not finished by then
+OUTBOX_CONCURRENCY = {'sms': 2, 'email': 1}  # drainers per channel
+
+# Ward/street dropdown lists (see myapp/reference_cache.py); entries are
+# also dropped as soon as a ward or street changes
+REFERENCE_CACHE_TTL = 24 * 60 * 60
+
+# Ward executive dashboard counts (see myapp/dashboard.py)
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 10))
+
+# Report moderation (see myapp/moderation.py)
+# Use 'myapp.moderation.LocalModerationBackend' to run without network access
+MODERATION_BACKEND = os.getenv('MODERATION_BACKEND', 'myapp.moderation.SightengineBackend')
 
 AUTH_USER_MODEL = 'myapp.CustomUser'
 
@@ -309,6 +385,22 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'myapp.notification_task.check_expired_bookings_task',
         'schedule': crontab(hour=0, minute=0),
     },
+    'cleanup-stale-uploads-hourly': {
+        'task': 'myapp.tasks.cleanup_stale_uploads_task',
+        'schedule': crontab(minute=30),
+    },
+    'collect-orphan-blobs-daily': {
+        'task': 'myapp.tasks.collect_orphan_blobs_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'drain-outbox-every-minute': {
+        'task': 'myapp.tasks.drain_outbox_task',
+        'schedule': crontab(),
+    },
+    'rollup-statistics': {
+        'task': 'myapp.tasks.rollup_statistics_task',
+        'schedule': crontab(minute='*/10'),
+    },
 }
 
 # Environment-aware Security Settings
@@ -3,7 +3,7 @@ from django.contrib import admin
 from django.views.decorators.csrf import csrf_exempt
 from graphene_django.views import GraphQLView
 from django.urls import path, include
-from django.conf.urls.static import static
+from myapp.views import serve_media
 
 # from myapp.views import verify_email
 
@@ -14,4 +14,5 @@ urlpatterns = [
     path('api/v1/', include('myapp.urls')),
     # path('api/v1/', include('myapprest.urls')),
     # path('verify-email/<uuid:token>/', verify_email, name='verify_email'),
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name='media'),
+]
@@ -16,6 +16,7 @@ from django.conf import settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.core.mail import send_mail
+from django.utils.timezone import now
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from myapp.models import CustomUser
 
@@ -179,7 +180,11 @@ class UserBuilder:
         if len(description) < 5:
             raise ValidationError("Description must be at least 20 characters long")
 
-        # Create and save the report (report_id is auto-generated)
+        if email and "@" not in email:
+            raise ValidationError("Invalid email")
+
+        # Create and save the report (report_id is auto-generated).
+        # The acknowledgement email is queued once moderation approves it.
         report = Report(description=description, email=email)
         
         if file_url:
@@ -187,26 +192,6 @@ class UserBuilder:
 
         report.save()
 
-        # Send email notification if the user provided an email
-        if email:
-            if "@" not in email:
-                raise ValidationError("Invalid email")
-
-            email_subject = f"Issue Report Received - Report ID: {report.report_id}"
-            email_body = (
-                f"Thank you for reporting an issue. Your report ID is: {report.report_id}.\n\n"
-                f"Description:\n{description}\n\n"
-                "Our team will review your report as soon as possible. Thank you for helping us improve our environment."
-            )
-
-            send_mail(
-                subject=email_subject,
-                message=email_body,
-                from_email='limbureubenn@gmail.com',
-                recipient_list=[email],
-                fail_silently=False,
-            )
-
         return report
     
     def get_report_history(user):
@@ -265,7 +250,7 @@ def register_user(input, registered_by=None):
         user = UserBuilder.register_user(input.username, input.password, input.passwordConfirm, role=role, email=getattr(input, 'email', ''), ward=ward, street=street, registered_by=registered_by)
         
         if hasattr(input, 'sessionId') and input.sessionId:
-            Report.objects.filter(submitted_by=input.sessionId).update(submitted_by=user.id)
+            Report.objects.filter(submitted_by=input.sessionId).update(submitted_by=user.id, updated_at=now())
 
         return RegistrationResponse(
             message="User registration successful",